@@ -9,7 +9,7 @@ import os
 import time
 import threading
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 import schedule
@@ -106,7 +106,7 @@ class AutomatedTrader:
                 
                 # Check if new day
                 last_reset = data.get("last_reset_date")
-                today = datetime.now().strftime("%Y-%m-%d")
+                today = date.today().isoformat()
                 
                 if last_reset != today:
                     # New day: count actual trades from broker/DB
@@ -142,11 +142,12 @@ class AutomatedTrader:
     def _save_state(self):
         """Save current trading state"""
         try:
+            now = datetime.now()
             data = {
                 "active_pairs": self.state.active_pairs,
                 "total_trades_today": self.state.total_trades_today,
-                "last_reset_date": datetime.now().strftime("%Y-%m-%d"),
-                "last_update": datetime.now().isoformat()
+                "last_reset_date": now.date().isoformat(),
+                "last_update": now.isoformat()
             }
             
             with open("automated_state.json", "w") as f:
@@ -42,11 +42,17 @@ def _save_state(state):
     except Exception as e:
         print(f"[EMAIL] Warning: failed to save dedupe state: {e}")
 
-def send_email(subject, body, to=None):
+def body_digest(body):
+    """Dedupe hash of an email body; compute once when sending one body to many recipients."""
+    return hashlib.sha256((body or "").encode("utf-8")).hexdigest()
+
+
+def send_email(subject, body, to=None, body_hash=None):
     """Send an email.
 
     If 'to' is provided, send to that recipient. Otherwise fall back to EMAIL_TO.
     This keeps backward compatibility with existing calls that don't pass 'to'.
+    'body_hash' may carry a precomputed body_digest(body) for broadcasts.
     """
     email_user = os.getenv("EMAIL_USER")
     email_pass = os.getenv("EMAIL_PASS")
@@ -60,7 +66,8 @@ def send_email(subject, body, to=None):
     # De-duplicate emails per (recipient, subject) based on body content
     normalized_recipient = (email_to or "").strip().lower()
     dedupe_key = f"{normalized_recipient}|{subject.strip()}"
-    body_hash = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    if body_hash is None:
+        body_hash = body_digest(body)
 
     with _state_lock:
         state = _load_state()
@@ -19,7 +19,7 @@ def _safe_fmt(value, fmt: str = ".2f", default: str = "N/A"):
     return str(value)
 
 from market_scanner import get_market_opportunities, MarketOpportunity
-from trader import place_trade
+from trader import place_trade, prefetch_market_spreads, reload_env_settings
 from monitor import monitor_trade
 from email_utils import send_email
 from signal_broadcast import send_signal
@@ -43,11 +43,12 @@ from oandapyV20 import API as OandaAPI
 import oandapyV20.endpoints.pricing as pricing
 import oandapyV20.endpoints.accounts as oanda_accounts
 from user_helpers import get_tier2_users_for_automation, Tier2User
-from oanda_helpers import create_oanda_client, get_user_open_positions, has_user_position_on_pair, get_user_active_pairs
+from oanda_helpers import get_shared_client, get_user_open_positions, has_user_position_on_pair, get_user_active_pairs
 from autopip_client import AutopipClient
 from validators import get_oanda_data
 
 load_dotenv()
+reload_env_settings()  # trader snapshots its env overrides at import, before .env was loaded
 
 # Import centralized DRY_RUN configuration
 from trading_config import get_dry_run
@@ -296,8 +297,8 @@ class EnhancedTradingSession:
             print(f"\n[ENHANCED] 👤 Processing user {user.user_id} ({user.email})")
             
             try:
-                # Create OANDA client for this user
-                user_client = create_oanda_client(user.oanda_api_key)
+                # This user's OANDA client (reused across cycles so its connections stay warm)
+                user_client = get_shared_client(user.oanda_api_key)
                 
                 # Fetch user's open positions
                 user_positions = get_user_open_positions(user_client, user.oanda_account_id)
@@ -323,6 +324,9 @@ class EnhancedTradingSession:
                     print(f"[ENHANCED] 📭 User {user.user_id}: No opportunities after position filtering ({len(filtered_opportunities)} available but all conflict with existing positions)")
                     continue
                 
+                # One PricingInfo request for every candidate's spread instead of one per validation
+                prefetch_market_spreads(user_client, user.oanda_account_id, [opp.symbol for opp in user_filtered_opps])
+                
                 # Opportunity collection + Signal Ranking: rank all opportunities, execute best first
                 ranked_list = rank_and_sort_opportunities(user_filtered_opps)
                 print(f"[ENHANCED] 📊 User {user.user_id}: Ranked {len(ranked_list)} opportunities by signal quality (top first)")
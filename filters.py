@@ -1,6 +1,11 @@
+import re
+
 from validators import is_forex_pair
 
 CRYPTO_KEYWORDS = ["bitcoin", "btc", "eth", "ethereum", "crypto"]
+# Crypto keywords matched as substrings in one pass (same semantics as `word in text`)
+_CRYPTO_RE = re.compile("|".join(map(re.escape, CRYPTO_KEYWORDS)))
+_FOREX_PAIR_RE = re.compile(r"\b([A-Z]{3})/?([A-Z]{3})\b")
 
 KEYWORDS = [
     # Trade intentions
@@ -30,12 +35,11 @@ KEYWORDS = [
 def is_crypto_idea(text):
     lines = text.lower().splitlines()
     idea_text = "\n".join(lines[:30])
-    return any(word in idea_text for word in CRYPTO_KEYWORDS)
+    return _CRYPTO_RE.search(idea_text) is not None
 
 
 def extract_forex_symbol(text):
-    import re
-    matches = re.findall(r"\b([A-Z]{3})/?([A-Z]{3})\b", text.upper())
+    matches = _FOREX_PAIR_RE.findall(text.upper())
     for match in matches:
         symbol = "".join(match)
         if is_forex_pair(symbol):
@@ -0,0 +1,135 @@
+"""
+Compiled inner loops for indicator math (EMA/ATR recurrences).
+The ATR kernels fuse the true-range pass into the smoothing loop, so no
+intermediate true-range list is built.
+
+numba is optional: without it the njit decorator is a no-op and HAVE_NUMBA is
+False, so callers keep their plain-Python loops (iterating a NumPy array in the
+interpreter is slower than iterating a list); ema_last alone has a NumPy
+closed form to fall back on, so it is usable whenever NumPy is. With numba, the kernels are
+compiled at import (from the on-disk cache after the first run) so the JIT
+pause never lands on a live validation.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # optional; see HAVE_NUMBA
+    np = None
+
+try:
+    from numba import njit
+    HAVE_NUMBA = np is not None
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (bare or with options)"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def _ema_kernel(values, multiplier):
+    ema = values[0]
+    for i in range(1, values.shape[0]):
+        ema = (values[i] * multiplier) + (ema * (1.0 - multiplier))
+    return ema
+
+
+def _ema_weighted(values, multiplier):
+    # Closed form of the recurrence: the seed decays by (1-m)^(n-1), values[i] enters with m*(1-m)^(n-1-i)
+    decay = (1.0 - multiplier) ** np.arange(values.shape[0] - 1, -1, -1, dtype=np.float64)
+    return values[0] * decay[0] + multiplier * np.dot(values[1:], decay[1:])
+
+
+def ema_last(values, periods):
+    """Last value of the EMA recurrence over values, seeded with values[0]; None if empty.
+    Needs NumPy; compiled with numba, else evaluated as one weighted dot product."""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.shape[0] == 0:
+        return None
+    multiplier = 2.0 / (periods + 1)
+    if HAVE_NUMBA:
+        return float(_ema_kernel(arr, multiplier))
+    return float(_ema_weighted(arr, multiplier))
+
+
+@njit(cache=True)
+def _true_range(h, l, c, i):
+    return max(h[i] - l[i], abs(h[i] - c[i - 1]), abs(l[i] - c[i - 1]))
+
+
+@njit(cache=True)
+def _tr_ema_kernel(h, l, c, multiplier):
+    # True ranges start at bar 1; the EMA is seeded with the first one
+    ema = _true_range(h, l, c, 1)
+    for i in range(2, h.shape[0]):
+        ema = (_true_range(h, l, c, i) * multiplier) + (ema * (1.0 - multiplier))
+    return ema
+
+
+@njit(cache=True)
+def _tr_wilder_kernel(h, l, c, period):
+    # Seed with the simple average of the first `period` true ranges, then Wilder-smooth
+    total = 0.0
+    for i in range(1, period + 1):
+        total += _true_range(h, l, c, i)
+    smoothed = total / period
+    for i in range(period + 1, h.shape[0]):
+        smoothed = (smoothed * (period - 1) + _true_range(h, l, c, i)) / period
+    return smoothed
+
+
+@njit(cache=True)
+def _wilder_smooth_kernel(values, period):
+    out = np.empty(values.shape[0] - period + 1)
+    total = 0.0
+    for i in range(period):
+        total += values[i]
+    out[0] = total / period
+    for i in range(period, values.shape[0]):
+        out[i - period + 1] = (out[i - period] * (period - 1) + values[i]) / period
+    return out
+
+
+def wilder_smooth(values, period):
+    """Full Wilder-smoothed series (validators._wilder_smooth semantics) as a list; [] if too few values"""
+    arr = np.asarray(values, dtype=np.float64)
+    if period <= 0 or arr.shape[0] < period:
+        return []
+    return _wilder_smooth_kernel(arr, period).tolist()
+
+
+def _hlc_arrays(highs, lows, closes):
+    return (np.asarray(highs, dtype=np.float64), np.asarray(lows, dtype=np.float64),
+            np.asarray(closes, dtype=np.float64))
+
+
+def atr_ema_last(highs, lows, closes, periods):
+    """EMA-smoothed ATR (trader.calculate_ema_atr semantics) in one pass; None if under 2 bars"""
+    h, l, c = _hlc_arrays(highs, lows, closes)
+    if h.shape[0] < 2:
+        return None
+    return float(_tr_ema_kernel(h, l, c, 2.0 / (periods + 1)))
+
+
+def atr_wilder_last(highs, lows, closes, period):
+    """Last Wilder-smoothed ATR (validators._wilder_smooth semantics) in one pass; None if too few bars"""
+    h, l, c = _hlc_arrays(highs, lows, closes)
+    if period <= 0 or h.shape[0] - 1 < period:
+        return None
+    return float(_tr_wilder_kernel(h, l, c, period))
+
+
+def warmup():
+    """Compile every kernel for the float64/int signatures the wrappers use"""
+    bars = np.linspace(1.0, 2.0, 30)
+    ema_last(bars, 21)
+    atr_ema_last(bars + 0.01, bars - 0.01, bars, 21)
+    atr_wilder_last(bars + 0.01, bars - 0.01, bars, 14)
+    wilder_smooth(bars, 14)
+
+
+if HAVE_NUMBA:
+    warmup()
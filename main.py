@@ -6,14 +6,14 @@ import time
 from datetime import datetime, timezone
 from scraper import get_trade_ideas
 from gpt_utils import evaluate_top_ideas
-from trader import place_trade
+from trader import place_trade, flush_pending_persists
 from monitor import monitor_trade
 from email_utils import send_email
 from signal_broadcast import send_signal
 from trade_email_helpers import send_admin_trade_notification
 from filters import rule_based_filter
 from validators import get_rsi, get_ema
-from trade_cache import is_trade_active, add_trade, remove_trade, get_active_trades
+from trade_cache import is_trade_active, add_trade, remove_trade, get_active_trades, install_sigterm_flush
 from trading_log import add_log_entry, get_daily_performance, load_log, get_pair_performance
 from validators import is_forex_pair
 from dotenv import load_dotenv
@@ -693,4 +693,6 @@ if __name__ == "__main__":
     if os.getenv("RENDER_DEBUG", "").lower() == "true":
         log_render_debug_info()
     
+    # SIGTERM: write the trade cache and queued trade records before exiting
+    install_sigterm_flush(flush_pending_persists)
     main()
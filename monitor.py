@@ -15,8 +15,6 @@ from db_persistence import update_trade_close_from_oanda_account
 from datetime import datetime, timezone
 from typing import Dict, Optional
 
-CACHE_FILE = "active_trades.json"
-
 
 def _safe_price_from_pricing(resp, side, instrument):
     try:
@@ -668,12 +666,8 @@ def monitor_trade(trade_details, api_key=None, account_id=None):
 
 
 def monitor_open_trades():
-    if not os.path.exists(CACHE_FILE):
-        print("[MONITOR] No trades to monitor.")
-        return
-
-    with open(CACHE_FILE, "r") as f:
-        trades = json.load(f)
+    # Read through trade_cache so unflushed in-memory changes are seen
+    trades = load_trades()
 
     if not trades:
         print("[MONITOR] Trade cache is empty.")
@@ -1,7 +1,11 @@
 import os
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Tuple
+
+
+# path -> (mtime, parsed events); re-read only when the file changes on disk
+_EVENTS_CACHE: Dict[str, Tuple[float, List[Tuple[str, str, datetime, datetime]]]] = {}
 
 
 def _load_events(path: str) -> List[Dict]:
@@ -16,6 +20,39 @@ def _load_events(path: str) -> List[Dict]:
 		return []
 
 
+def _naive_utc(dt: datetime) -> datetime:
+
+	# Events with an offset are compared against naive utcnow(); convert rather than mix the two
+	if dt.tzinfo is not None:
+		return dt.astimezone(timezone.utc).replace(tzinfo=None)
+	return dt
+
+
+def _parsed_events(path: str) -> List[Tuple[str, str, datetime, datetime]]:
+
+	try:
+		mtime = os.stat(path).st_mtime
+	except OSError:
+		return []
+	cached = _EVENTS_CACHE.get(path)
+	if cached is not None and cached[0] == mtime:
+		return cached[1]
+	parsed = []
+	for ev in _load_events(path):
+		try:
+			cur = str(ev.get("currency", "")).upper()
+			impact = str(ev.get("impact", "")).lower()
+			start_iso = ev.get("start")
+			end_iso = ev.get("end")
+			if not (cur and start_iso and end_iso):
+				continue
+			parsed.append((cur, impact, _naive_utc(datetime.fromisoformat(start_iso)), _naive_utc(datetime.fromisoformat(end_iso))))
+		except Exception:
+			continue
+	_EVENTS_CACHE[path] = (mtime, parsed)
+	return parsed
+
+
 def _instrument_currencies(instrument: str) -> List[str]:
 
 	clean = instrument.upper().replace("_", "").replace("/", "")
@@ -35,31 +72,20 @@ def is_news_blackout(instrument: str) -> bool:
 	mins_before = int(os.getenv("NEWS_BLACKOUT_MINUTES_BEFORE", "30"))
 	mins_after = int(os.getenv("NEWS_BLACKOUT_MINUTES_AFTER", "15"))
 
-	events = _load_events(events_file)
+	events = _parsed_events(events_file)
 	if not events:
 		return False
 
 	now = datetime.utcnow()
 	currencies = set(_instrument_currencies(instrument))
+	before = timedelta(minutes=mins_before)
+	after = timedelta(minutes=mins_after)
 
-	for ev in events:
-		try:
-			cur = str(ev.get("currency", "")).upper()
-			impact = str(ev.get("impact", "")).lower()
-			start_iso = ev.get("start")
-			end_iso = ev.get("end")
-			if not (cur and start_iso and end_iso and impact in impact_levels):
-				continue
-			if cur not in currencies:
-				continue
-			start = datetime.fromisoformat(start_iso)
-			end = datetime.fromisoformat(end_iso)
-			window_start = start - timedelta(minutes=mins_before)
-			window_end = end + timedelta(minutes=mins_after)
-			if window_start <= now <= window_end:
-				return True
-		except Exception:
+	for cur, impact, start, end in events:
+		if impact not in impact_levels or cur not in currencies:
 			continue
+		if start - before <= now <= end + after:
+			return True
 
 	return False
 
@@ -4,7 +4,10 @@ Helper functions for OANDA API operations, including per-user account operations
 
 import oandapyV20
 from oandapyV20.endpoints.trades import TradesList
+from functools import lru_cache
 from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def create_oanda_client(api_key: str, environment: str = "live") -> oandapyV20.API:
@@ -12,6 +15,17 @@ def create_oanda_client(api_key: str, environment: str = "live") -> oandapyV20.A
     return oandapyV20.API(access_token=api_key, environment=environment)
 
 
+@lru_cache(maxsize=32)
+def get_shared_client(api_key: str, environment: str = "live") -> oandapyV20.API:
+    """One OANDA API client per (key, environment), so its HTTP session keeps connections alive across calls.
+    The pool is sized for the concurrent validation/pre-trade fetches; only idempotent GETs are retried,
+    so an order POST is never resent."""
+    client = create_oanda_client(api_key, environment)
+    retry = Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    client.client.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry))
+    return client
+
+
 def get_user_open_positions(client: oandapyV20.API, account_id: str) -> List[Dict]:
     """
     Fetch open positions for a specific OANDA account.
@@ -17,6 +17,12 @@ CORRELATION_GROUPS = [
     {"name": "USD_MAJORS", "members": ["EURUSD", "GBPUSD", "AUDUSD", "NZDUSD", "USDCAD", "USDCHF"]},
     {"name": "YEN_CROSSES", "members": ["USDJPY", "EURJPY", "GBPJPY", "AUDJPY", "NZDJPY", "CADJPY"]},
 ]
+# member symbol -> (group name, members), built once; each symbol is in at most one group
+_SYMBOL_TO_GROUP: Dict[str, Tuple[str, frozenset]] = {
+    member: (g["name"], frozenset(g["members"]))
+    for g in CORRELATION_GROUPS
+    for member in g["members"]
+}
 
 logger = logging.getLogger(__name__)
 
@@ -123,25 +129,18 @@ def calculate_portfolio_risk(
 
 def get_correlation_group(symbol: str) -> Optional[str]:
     """Return correlation group name if symbol belongs to one."""
-    sym = _normalize_symbol(symbol)
-    for g in CORRELATION_GROUPS:
-        if sym in g["members"]:
-            return g["name"]
-    return None
+    entry = _SYMBOL_TO_GROUP.get(_normalize_symbol(symbol))
+    return entry[0] if entry else None
 
 
 def get_correlated_risk_pct(balance: float, open_risk_details: List[Dict], new_symbol: str) -> float:
     """Return portfolio risk % that comes from open trades in the same correlation group as new_symbol."""
     if not balance or balance <= 0 or not open_risk_details:
         return 0.0
-    group = get_correlation_group(new_symbol)
-    if not group:
+    entry = _SYMBOL_TO_GROUP.get(_normalize_symbol(new_symbol))
+    if not entry:
         return 0.0
-    members = set()
-    for g in CORRELATION_GROUPS:
-        if g["name"] == group:
-            members = set(g["members"])
-            break
+    members = entry[1]
     correlated_risk_usd = sum(
         d["risk_usd"] for d in open_risk_details
         if _normalize_symbol((d.get("symbol") or d.get("instrument") or "")) in members
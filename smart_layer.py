@@ -211,18 +211,11 @@ def compute_smart_exits(symbol: str, side: str, entry_price: float, atr_price_un
     # Get M15 ATR for execution-timeframe buffer
     m15_atr_pips = None
     try:
-        from validators import get_oanda_data, _calculate_true_ranges_from_hlc, _wilder_smooth
-        m15_candles = get_oanda_data(symbol, "M15", 30, oanda_client=oanda_client)
-        if m15_candles and len(m15_candles) >= 21:
-            highs = [float(c["mid"]["h"]) for c in m15_candles]
-            lows = [float(c["mid"]["l"]) for c in m15_candles]
-            closes = [float(c["mid"]["c"]) for c in m15_candles]
-            tr_list = _calculate_true_ranges_from_hlc(highs, lows, closes)
-            m15_atr_series = _wilder_smooth(tr_list, 14)
-            m15_atr = m15_atr_series[-1] if m15_atr_series else None
-            if m15_atr:
-                m15_atr_pips = (m15_atr / pip) if pip > 0 else None
-                print(f"[SMART] M15 ATR: {m15_atr_pips:.1f} pips (execution timeframe buffer)")
+        from validators import get_m15_atr
+        m15_atr = get_m15_atr(symbol, oanda_client=oanda_client)
+        if m15_atr:
+            m15_atr_pips = (m15_atr / pip) if pip > 0 else None
+            print(f"[SMART] M15 ATR: {m15_atr_pips:.1f} pips (execution timeframe buffer)")
     except Exception as e:
         print(f"[SMART] ⚠️ Could not calculate M15 ATR: {e}")
     
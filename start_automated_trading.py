@@ -191,6 +191,11 @@ def main():
     # Import and start the automated trader
     try:
         from automated_trader import AutomatedTrader
+        from trade_cache import install_sigterm_flush
+        from trader import flush_pending_persists
+        
+        # docker stop sends SIGTERM: write the trade cache and queued trade records before exiting
+        install_sigterm_flush(flush_pending_persists)
         
         trader = AutomatedTrader()
         trader.start_automation()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trade_cache
+
+
+@pytest.fixture(autouse=True)
+def active_trades_cache(monkeypatch, tmp_path):
+    """Back trade_cache with an in-memory store so tests never touch the real trade cache"""
+    store = {"trades": []}
+    trade_cache._invalidate()
+    # The cross-process lock file lives beside CACHE_FILE
+    monkeypatch.setattr(trade_cache, "CACHE_FILE", str(tmp_path / "active_trades.cache"))
+    monkeypatch.setattr(trade_cache, "_load_raw", lambda: (list(store["trades"]), 0))
+    monkeypatch.setattr(trade_cache, "_save_raw", lambda trades: store.__setitem__("trades", list(trades)))
+    monkeypatch.setattr(
+        trade_cache, "_append_raw",
+        lambda records: store.__setitem__("trades", trade_cache._apply_ops(store["trades"], records)),
+    )
+    yield store
+    trade_cache.flush()
+    store["trades"].clear()
+    trade_cache._invalidate()
@@ -10,7 +10,8 @@ import json
 import tempfile
 import threading
 import time
-from datetime import datetime, timedelta
+from types import SimpleNamespace
+from datetime import date, datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
 # Import modules to test
@@ -22,8 +23,17 @@ from trade_cache import (
     sync_cache_with_broker, get_active_trades
 )
 from monitor import _classify_close_reason
+import validators
 from validators import passes_h4_hard_filters
-from trader import place_trade  # Will mock this for ID extraction test
+from trader import place_trade, atr_stop_distances  # Will mock place_trade for ID extraction test
+
+# Broker TradesList payload for the sync test (read-only, shared across runs)
+_BROKER_TRADES_RESPONSE = {
+    "trades": [
+        {"id": "trade_5"},  # Only these trades are still open
+        {"id": "trade_6"},
+    ]
+}
 
 
 class TestCacheLocking(unittest.TestCase):
@@ -87,40 +97,40 @@ class TestCacheLocking(unittest.TestCase):
         """Test sync_cache_with_broker doesn't corrupt cache under concurrency"""
         import trade_cache
         
-        # Add some test trades
+        # Add some test trades (as pyramid adds so same symbol+direction is allowed)
         for i in range(10):
-            add_trade(f"EURUSD", "buy", 1.1000, f"trade_{i}")
-        
-        # Mock broker client
-        mock_client = Mock()
-        mock_response = Mock()
-        mock_response.response = {
-            "trades": [
-                {"id": "trade_5"},  # Only one trade still open
-                {"id": "trade_6"},
-            ]
-        }
+            add_trade(f"EURUSD", "buy", 1.1000, f"trade_{i}", parent_trade_id="trade_0")
+        
+        # Stub broker client; sync only calls client.request() and reads .response
+        mock_client = SimpleNamespace(request=lambda endpoint: None)
+        mock_response = SimpleNamespace(response=_BROKER_TRADES_RESPONSE)
+        
+        start_evt = threading.Event()
         
         def sync_worker():
             """Sync cache concurrently"""
+            start_evt.wait()
             try:
-                with patch('oandapyV20.endpoints.trades.TradesList') as MockTradesList:
-                    MockTradesList.return_value = mock_response
-                    sync_cache_with_broker(mock_client, "test_account")
+                sync_cache_with_broker(mock_client, "test_account")
             except Exception as e:
                 errors.append(str(e))
         
         errors = []
         threads = []
         
-        # Spawn 3 threads syncing concurrently
-        for _ in range(3):
-            t = threading.Thread(target=sync_worker)
-            threads.append(t)
-            t.start()
-        
-        for t in threads:
-            t.join(timeout=5.0)
+        # Patch once outside the workers; patch() itself is not thread-safe
+        with patch('oandapyV20.endpoints.trades.TradesList') as MockTradesList:
+            MockTradesList.return_value = mock_response
+            
+            # Spawn 2 threads and release them together so both race into the sync
+            for _ in range(2):
+                t = threading.Thread(target=sync_worker)
+                threads.append(t)
+                t.start()
+            start_evt.set()
+            
+            for t in threads:
+                t.join(timeout=5.0)
         
         # Verify no errors
         self.assertEqual(len(errors), 0, f"Errors during concurrent sync: {errors}")
@@ -378,8 +388,9 @@ class TestStateCorrectness(unittest.TestCase):
         # This is a structural test - actual implementation handles broker query
         # We test the logic flow
         
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        today = datetime.now().strftime("%Y-%m-%d")
+        today_date = date.today()
+        today = today_date.isoformat()
+        yesterday = (today_date - timedelta(days=1)).isoformat()
         
         # Simulate state data
         state_data = {
@@ -406,15 +417,9 @@ class TestSafetyAssertions(unittest.TestCase):
         """Test that duplicate trade IDs are detected"""
         import trade_cache
         
-        # Create temp file
-        temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
-        temp_file.write(json.dumps([]))
-        temp_file.close()
-        
-        original_cache = trade_cache.CACHE_FILE
-        trade_cache.CACHE_FILE = temp_file.name
-        
-        try:
+        # Patch the raw load/save primitives so no cache file is touched
+        with patch.object(trade_cache, "_load_raw", return_value=([], None)), \
+                patch.object(trade_cache, "_save_raw") as save_mock:
             # Add first trade
             result1 = add_trade("EURUSD", "buy", 1.1000, "trade_123")
             self.assertTrue(result1, "First trade should be added")
@@ -423,12 +428,115 @@ class TestSafetyAssertions(unittest.TestCase):
             result2 = add_trade("EURUSD", "buy", 1.1000, "trade_123")
             self.assertFalse(result2, "Duplicate trade ID should be rejected")
             
-            # Verify only one trade exists
+            # Verify only the first trade was persisted
+            trade_cache.flush()
+            self.assertEqual(save_mock.call_count, 1, "Duplicate should not be saved")
             trades = get_active_trades()
             self.assertEqual(len(trades), 1, "Should have only one trade")
+
+
+class TestATRStopDistances(unittest.TestCase):
+    """Test the ATR-based SL/TP distance policy used by place_trade"""
+    
+    def test_h4_distance_without_m15(self):
+        """Missing M15 ATR falls back to the H4 multiple"""
+        sl, tp = atr_stop_distances(0.0100, None, 2.0, 2.8, 1.6)
+        self.assertAlmostEqual(sl, 0.0200)
+        # 2.8x ATR (0.028) is below 1.8R (0.036), so TP is widened
+        self.assertAlmostEqual(tp, 0.0360)
+    
+    def test_m15_buffer_wins_when_wider(self):
+        """2.5x M15 ATR replaces the H4 distance when it is larger"""
+        sl, tp = atr_stop_distances(0.0100, 0.0100, 2.0, 6.0, 1.6)
+        self.assertAlmostEqual(sl, 0.0250)
+        self.assertAlmostEqual(tp, 0.0600, msg="TP already beyond 1.8R should be kept")
+
+
+class _FakeH4Feed:
+    """OANDA-style H4 feed: `closed` complete candles plus one forming candle at `price`"""
+    
+    def __init__(self, closed):
+        self.closed = closed
+        self.price = 1.0
+        self.counts = []
+    
+    def _candle(self, i, complete):
+        price = 1.0 + i / 1000 if complete else self.price
+        return {"time": f"{i:06d}", "complete": complete,
+                "mid": {"o": str(price), "h": str(price), "l": str(price), "c": str(price)}}
+    
+    def request(self, endpoint):
+        count = endpoint.params["count"]
+        self.counts.append(count)
+        candles = [self._candle(i, True) for i in range(self.closed)] + [self._candle(self.closed, False)]
+        endpoint.response = {"candles": candles[-count:]}
+
+
+class TestH4CandleCache(unittest.TestCase):
+    """Test that cached H4 history never freezes the forming candle"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.patches = [
+            patch.object(validators, "CANDLE_CACHE_DIR", os.path.join(self.temp_dir, "candles")),
+            patch.object(validators, "CANDLE_TAIL_TTL_S", 0),
+            patch.object(validators, "_CANDLE_CACHE", {}),
+            patch.object(validators, "_CANDLE_CURRENT", {}),
+            patch.object(validators, "_HLC_CACHE", {}),
+            patch.object(validators.instruments, "InstrumentsCandles",
+                         lambda instrument, params: SimpleNamespace(params=params, response=None)),
+        ]
+        for p in self.patches:
+            p.start()
+    
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_forming_candle_is_refetched(self):
+        """History is fetched once; every read still sees the latest forming candle"""
+        feed = _FakeH4Feed(closed=300)
+        validators.get_oanda_data("EURUSD", "H4", 50, oanda_client=feed)
+        feed.price = 2.0  # counts[:2] was the cold start: tail, then full history
+        candles = validators.get_oanda_data("EURUSD", "H4", 50, oanda_client=feed)
+        self.assertEqual(candles[-1]["mid"]["c"], "2.0")
+        self.assertEqual(validators.get_oanda_hlc("EURUSD", "H4", 5, oanda_client=feed)[2][-1], 2.0)
+        self.assertEqual(max(feed.counts[2:]), validators._CANDLE_TAIL_COUNT,
+                         "Only the tail should be refetched while no candle completes")
+    
+    def test_completed_candle_rolls_history_forward(self):
+        """A newly completed candle is appended without refetching the history"""
+        feed = _FakeH4Feed(closed=300)
+        validators.get_oanda_data("EURUSD", "H4", 210, oanda_client=feed)
+        feed.closed += 1
+        candles = validators.get_oanda_data("EURUSD", "H4", 210, oanda_client=feed)
+        self.assertEqual([c["time"] for c in candles], [f"{i:06d}" for i in range(92, 302)])
+        self.assertEqual(candles[-2]["complete"], True)
+        self.assertEqual(max(feed.counts[2:]), validators._CANDLE_TAIL_COUNT)
+
+    def test_concurrent_pairs_all_get_data(self):
+        """Scanner-style parallel reads of different pairs never lose one to a cache race"""
+        from concurrent.futures import ThreadPoolExecutor
+        pairs = [f"PAIR{i:02d}" for i in range(24)]
+        feeds = {pair: _FakeH4Feed(closed=300) for pair in pairs}
+
+        def read(pair):
+            results = []
+            for step in range(5):
+                feeds[pair].closed += step % 2  # complete a candle every other read
+                results.append(validators.get_oanda_data(pair, "H4", 100, oanda_client=feeds[pair]))
+            return results
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads often enough to expose unguarded iteration
+        try:
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                for results in pool.map(read, pairs):
+                    self.assertTrue(all(candles for candles in results))
         finally:
-            os.unlink(temp_file.name)
-            trade_cache.CACHE_FILE = original_cache
+            sys.setswitchinterval(interval)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,207 @@
+"""
+On-disk trade cache: log records, torn tails, compaction, legacy migration and
+two processes sharing one file. These run against real files in tmp_path, so the
+in-memory store from conftest is swapped back out for the real I/O primitives.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import datetime, timedelta
+
+import pytest
+
+import trade_cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Captured at import, before the autouse conftest fixture patches them
+_REAL_IO = {name: getattr(trade_cache, name) for name in ("_load_raw", "_save_raw", "_append_raw")}
+FORMATS = ["json", pytest.param("msgpack", marks=pytest.mark.skipif(
+    trade_cache.msgpack is None, reason="msgpack not installed"))]
+
+
+@pytest.fixture(params=FORMATS)
+def cache_file(request, monkeypatch, tmp_path):
+    """Point trade_cache at a real cache file in tmp_path, in each storage format"""
+    fmt = request.param
+    path = tmp_path / ("active_trades.mpack" if fmt == "msgpack" else "active_trades.json")
+    for name, func in _REAL_IO.items():
+        monkeypatch.setattr(trade_cache, name, func)
+    monkeypatch.setattr(trade_cache, "CACHE_FORMAT", fmt)
+    monkeypatch.setattr(trade_cache, "CACHE_FILE", str(path))
+    monkeypatch.setattr(trade_cache, "LEGACY_CACHE_FILE", str(tmp_path / "active_trades.json"))
+    monkeypatch.setattr(trade_cache, "FLUSH_INTERVAL_S", 60)  # tests flush explicitly
+    trade_cache._invalidate()
+    yield path
+    trade_cache.flush()
+    trade_cache._invalidate()
+
+
+def _reload():
+    """Drop the in-memory copy and read the cache file back"""
+    trade_cache._invalidate()
+    return {t["trade_id"]: t for t in trade_cache.load_trades()}
+
+
+def _records(path):
+    return trade_cache._decode_records(path.read_bytes())
+
+
+def test_add_remove_update_round_trip(cache_file):
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    trade_cache.add_trade("GBP_USD", "sell", 1.3, "2")
+    assert trade_cache.flush()
+    trade_cache.add_trade("USD_JPY", "buy", 150.0, "3")
+    trade_cache.remove_trade("2")
+    trade_cache.update_trade("1", {"sl_price": 1.09})
+    assert trade_cache.flush()
+
+    # One snapshot, then the three later changes appended as log records
+    records = _records(cache_file)
+    assert isinstance(records[0], list)
+    assert [r["op"] for r in records[1:]] == ["add", "remove", "update"]
+
+    trades = _reload()
+    assert set(trades) == {"1", "3"}
+    assert trades["1"]["sl_price"] == 1.09
+    assert trade_cache.is_trade_active("USD_JPY", "buy")
+
+
+def test_torn_final_record_is_skipped(cache_file):
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    assert trade_cache.flush()
+    with open(cache_file, "ab") as f:
+        if trade_cache.CACHE_FORMAT == "msgpack":
+            f.write(trade_cache._FRAME.pack(500) + b"\x81")  # frame longer than the file
+        else:
+            f.write(b'{"op":"add","trade":{"trade_')
+
+    assert set(_reload()) == {"1"}
+
+
+def test_log_is_compacted_into_one_snapshot(cache_file, monkeypatch):
+    monkeypatch.setattr(trade_cache, "COMPACT_MIN_RECORDS", 4)
+    monkeypatch.setattr(trade_cache, "COMPACT_FACTOR", 1)
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "keep")
+    assert trade_cache.flush()
+    for i in range(6):
+        trade_cache.add_trade("GBP_USD", "buy", 1.3, f"tmp{i}")
+        assert trade_cache.flush()
+        trade_cache.remove_trade(f"tmp{i}")
+        assert trade_cache.flush()
+        assert len(_records(cache_file)) <= 5
+
+    assert set(_reload()) == {"keep"}
+
+
+def test_reload_keeps_appending_to_the_log(cache_file):
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    assert trade_cache.flush()
+    trade_cache.add_trade("GBP_USD", "sell", 1.3, "2")
+    assert trade_cache.flush()
+
+    # A fresh load (restart, or another process's write) resumes the log instead of rewriting it
+    _reload()
+    trade_cache.add_trade("USD_JPY", "buy", 150.0, "3")
+    assert trade_cache.flush()
+    records = _records(cache_file)
+    assert isinstance(records[0], list)
+    assert [r["op"] for r in records[1:]] == ["add", "add"]
+
+
+def test_torn_tail_is_rewritten_before_appending(cache_file):
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    assert trade_cache.flush()
+    with open(cache_file, "ab") as f:
+        f.write(trade_cache._FRAME.pack(500) if trade_cache.CACHE_FORMAT == "msgpack" else b'{"op":')
+
+    _reload()
+    trade_cache.add_trade("GBP_USD", "sell", 1.3, "2")
+    assert trade_cache.flush()
+    assert len(_records(cache_file)) == 1
+    assert set(_reload()) == {"1", "2"}
+
+
+def test_legacy_json_array_is_migrated(cache_file):
+    if trade_cache.CACHE_FILE == trade_cache.LEGACY_CACHE_FILE:
+        pytest.skip("JSON mode reads the legacy file in place")
+    legacy = trade_cache.LEGACY_CACHE_FILE
+    with open(legacy, "w") as f:
+        json.dump([{"symbol": "EURUSD", "direction": "buy", "trade_id": "42"}], f, indent=2)
+
+    assert set(_reload()) == {"42"}
+    assert cache_file.exists()
+    assert not os.path.exists(legacy)
+    assert os.path.exists(legacy + ".bak")
+
+
+def _run_other_process(cache_path, fmt, code):
+    """Run trade_cache code in a separate interpreter sharing the same cache file"""
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {REPO_ROOT!r})
+        import trade_cache
+        trade_cache.CACHE_FORMAT = {fmt!r}
+        trade_cache.CACHE_FILE = {str(cache_path)!r}
+        trade_cache.LEGACY_CACHE_FILE = {str(cache_path.parent / "legacy.json")!r}
+    """) + textwrap.dedent(code)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_two_writers_merge_instead_of_overwriting(cache_file):
+    fmt = trade_cache.CACHE_FORMAT
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    assert trade_cache.flush()
+
+    # Unflushed local change while another process appends its own trade
+    trade_cache.add_trade("GBP_USD", "sell", 1.3, "2")
+    _run_other_process(cache_file, fmt, """
+        trade_cache.add_trade("USD_JPY", "buy", 150.0, "3")
+        assert trade_cache.flush()
+    """)
+
+    # The other process's trade is visible before our flush, so dedupe sees it
+    assert trade_cache.is_trade_active("USD_JPY", "buy")
+    assert trade_cache.add_trade("USD_JPY", "buy", 150.0, "3") is False
+    assert trade_cache.flush()
+
+    assert set(_reload()) == {"1", "2", "3"}
+    out = _run_other_process(cache_file, fmt, """
+        print(sorted(t["trade_id"] for t in trade_cache.load_trades()))
+    """)
+    assert out.strip() == "['1', '2', '3']"
+
+
+def test_broker_sync_keeps_trades_added_by_another_process(cache_file):
+    fmt = trade_cache.CACHE_FORMAT
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "1")
+    trade_cache.add_trade("GBP_USD", "sell", 1.3, "2")
+    assert trade_cache.flush()
+
+    # Trade 2 closed at the broker; trade 3 is opened elsewhere before the removal is flushed
+    assert trade_cache._remove_trades(["2"]) == 1
+    _run_other_process(cache_file, fmt, """
+        trade_cache.add_trade("USD_JPY", "buy", 150.0, "3")
+        assert trade_cache.flush()
+    """)
+    assert trade_cache.flush()
+
+    assert set(_reload()) == {"1", "3"}
+
+
+@pytest.mark.skipif(trade_cache.np is None, reason="numpy not installed")
+@pytest.mark.parametrize("vectorize_min", [1, 10 ** 9])
+def test_stale_cleanup_agrees_between_numpy_and_python_paths(monkeypatch, vectorize_min):
+    monkeypatch.setattr(trade_cache, "VECTORIZE_MIN_TRADES", vectorize_min)
+    old = (datetime.now() - timedelta(hours=100)).isoformat()
+    trade_cache.add_trade("EUR_USD", "buy", 1.1, "old", timestamp=old)
+    trade_cache.add_trade("GBP_USD", "buy", 1.3, "fresh")
+    # Offset timestamps cannot be aged against naive local time; both paths keep them
+    trade_cache.add_trade("USD_JPY", "buy", 150.0, "aware", timestamp="2020-01-01T00:00:00+00:00")
+
+    assert trade_cache.cleanup_stale_trades(max_age_hours=72) == 1
+    assert {t["trade_id"] for t in trade_cache.get_active_trades()} == {"fresh", "aware"}
@@ -4,25 +4,52 @@ Validation Test Summary - Code Review Based
 Validates fixes without requiring full environment setup.
 """
 
-import os
+import re
 import sys
+from functools import lru_cache
+
+# One alternation per source file so each file is scanned in a single pass
+_PATTERNS = {
+    "cache": re.compile(r"fcntl|LOCK_(?:SH|EX)|with _cache_lock|_cache_lock|sync_cache_with_broker"),
+    "monitor": re.compile(r"_classify_close_reason|CLOSED_(?:TP|SL|TRAILING|PARTIAL|EXTERNALLY)"),
+    "enhanced": re.compile(
+        r"passes_h4_hard_filters|validate_entry_conditions|relax=True"
+        r"|timeframes=\[([\"'])H1\1,\1M15\1\]"
+    ),
+    "trader": re.compile(r'tradesOpened|tradeOpened|get\("tradeID"\)|tradeID|ValueError'),
+}
+
+
+@lru_cache(maxsize=None)
+def _read_source(path):
+    """Read a source file once; None if it does not exist"""
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _scan(key, content):
+    """Return the set of tokens from _PATTERNS[key] found in content"""
+    return {m.group(0) for m in _PATTERNS[key].finditer(content)}
+
 
 def test_cache_locking_implementation():
     """Verify cache locking is implemented"""
     print("Testing: Cache locking implementation...")
     
     cache_file = "OfficialTBot/trade_cache.py"
-    if not os.path.exists(cache_file):
-        return False, "Cache file not found"
-    
-    with open(cache_file, 'r') as f:
-        content = f.read()
+    content = _read_source(cache_file)
+    if content is None:
+        return False, f"{cache_file} not found"
     
+    found = _scan("cache", content)
     checks = [
-        ('fcntl' in content, "File locking imported"),
-        ('LOCK_SH' in content or 'LOCK_EX' in content, "Lock constants used"),
-        ('_cache_lock' in content, "Thread lock variable defined"),
-        ('sync_cache_with_broker' in content and 'with _cache_lock' in content, "Sync uses lock"),
+        ('fcntl' in found, "File locking imported"),
+        (bool({'LOCK_SH', 'LOCK_EX'} & found), "Lock constants used"),
+        ('_cache_lock' in found, "Thread lock variable defined"),
+        ({'sync_cache_with_broker', 'with _cache_lock'} <= found, "Sync uses lock"),
     ]
     
     all_pass = all(check[0] for check in checks)
@@ -42,19 +69,18 @@ def test_close_reason_classification():
     print("\nTesting: Close reason classification...")
     
     monitor_file = "OfficialTBot/monitor.py"
-    if not os.path.exists(monitor_file):
-        return False, "Monitor file not found"
-    
-    with open(monitor_file, 'r') as f:
-        content = f.read()
+    content = _read_source(monitor_file)
+    if content is None:
+        return False, f"{monitor_file} not found"
     
+    found = _scan("monitor", content)
     checks = [
-        ('_classify_close_reason' in content, "Classification function exists"),
-        ('CLOSED_TP' in content, "TP classification"),
-        ('CLOSED_SL' in content, "SL classification"),
-        ('CLOSED_TRAILING' in content, "Trailing stop classification"),
-        ('CLOSED_PARTIAL' in content, "Partial close classification"),
-        ('CLOSED_EXTERNALLY' in content, "External close classification"),
+        ('_classify_close_reason' in found, "Classification function exists"),
+        ('CLOSED_TP' in found, "TP classification"),
+        ('CLOSED_SL' in found, "SL classification"),
+        ('CLOSED_TRAILING' in found, "Trailing stop classification"),
+        ('CLOSED_PARTIAL' in found, "Partial close classification"),
+        ('CLOSED_EXTERNALLY' in found, "External close classification"),
     ]
     
     all_pass = all(check[0] for check in checks)
@@ -74,18 +100,17 @@ def test_validation_gate_ordering():
     print("\nTesting: Validation gate ordering...")
     
     enhanced_file = "OfficialTBot/enhanced_main.py"
-    if not os.path.exists(enhanced_file):
-        return False, "Enhanced main file not found"
-    
-    with open(enhanced_file, 'r') as f:
-        content = f.read()
+    content = _read_source(enhanced_file)
+    if content is None:
+        return False, f"{enhanced_file} not found"
     
+    found = _scan("enhanced", content)
     # Check that H4 is checked before H1/M15 and that H4 is excluded from H1/M15 check
     checks = [
-        ('passes_h4_hard_filters' in content, "H4 filter check exists"),
-        ('validate_entry_conditions' in content, "Entry validation exists"),
-        ('timeframes=["H1","M15"]' in content or 'timeframes=[\'H1\',\'M15\']' in content, "H4 excluded from detailed check"),
-        ('relax=True' in content and 'passes_h4_hard_filters' in content, "H4 uses relax mode"),
+        ('passes_h4_hard_filters' in found, "H4 filter check exists"),
+        ('validate_entry_conditions' in found, "Entry validation exists"),
+        (any(tok.startswith('timeframes=') for tok in found), "H4 excluded from detailed check"),
+        ({'relax=True', 'passes_h4_hard_filters'} <= found, "H4 uses relax mode"),
     ]
     
     all_pass = all(check[0] for check in checks)
@@ -105,16 +130,15 @@ def test_trade_id_validation():
     print("\nTesting: Trade ID validation...")
     
     trader_file = "OfficialTBot/trader.py"
-    if not os.path.exists(trader_file):
-        return False, "Trader file not found"
-    
-    with open(trader_file, 'r') as f:
-        content = f.read()
+    content = _read_source(trader_file)
+    if content is None:
+        return False, f"{trader_file} not found"
     
+    found = _scan("trader", content)
     checks = [
-        ('tradeOpened' in content and 'get("tradeID")' in content, "Primary path exists"),
-        ('tradesOpened' in content, "Fallback path exists"),
-        ('ValueError' in content and 'tradeID' in content, "Error handling exists"),
+        ({'tradeOpened', 'get("tradeID")'} <= found, "Primary path exists"),
+        ('tradesOpened' in found, "Fallback path exists"),
+        ({'ValueError', 'tradeID'} <= found, "Error handling exists"),
     ]
     
     all_pass = all(check[0] for check in checks)
@@ -141,14 +165,12 @@ def test_safety_assertions():
     
     all_pass = True
     for file_path, keywords in files_to_check:
-        if not os.path.exists(file_path):
+        content = _read_source(file_path)
+        if content is None:
             print(f"  ❌ File not found: {file_path}")
             all_pass = False
             continue
         
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
         found = [kw for kw in keywords if kw in content]
         if found:
             print(f"  ✅ {file_path}: Found {len(found)}/{len(keywords)} safety checks")
@@ -1,56 +1,479 @@
+import atexit
 import json
 import os
 import fcntl
+import mmap
+import signal
+import struct
+import sys
 import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
-CACHE_FILE = "active_trades.json"
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when missing
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; the cache stays JSON when missing
+    msgpack = None
+
+try:
+    import numpy as np
+except ImportError:  # optional; large-cache scans fall back to pure Python
+    np = None
+
+# TRADE_CACHE_FORMAT=json keeps a human-readable cache for debugging
+CACHE_FORMAT = os.getenv("TRADE_CACHE_FORMAT", "msgpack").strip().lower()
+if CACHE_FORMAT == "msgpack" and msgpack is None:
+    CACHE_FORMAT = "json"
+LEGACY_CACHE_FILE = "active_trades.json"
+CACHE_FILE = "active_trades.mpack" if CACHE_FORMAT == "msgpack" else LEGACY_CACHE_FILE
+# TRADE_CACHE_PRETTY=true (json format only) rewrites the whole file as an indented array
+# on every flush so it can be read by eye; the default is compact, one record per line
+CACHE_PRETTY = CACHE_FORMAT == "json" and os.getenv("TRADE_CACHE_PRETTY", "false").lower() == "true"
+# The file is an append-only log: a snapshot (list of trades) followed by
+# {"op": "add"|"remove"|"update", ...} records. JSON is one record per line;
+# MessagePack records are framed with a 4-byte big-endian length so a torn tail is detectable.
+_FRAME = struct.Struct(">I")
+# Rewrite the log as a single snapshot once appended records outgrow the live trades
+COMPACT_FACTOR = 4
+COMPACT_MIN_RECORDS = 64
+_DECODE_ERRORS = (ValueError,) + ((msgpack.UnpackException,) if msgpack is not None else ())
 # Thread-local lock to prevent deadlocks within same process
-_cache_lock = threading.Lock()
+# (re-entrant: sync_cache_with_broker holds it while calling load_trades and _remove_trades)
+_cache_lock = threading.RLock()
+# Across processes (monitor/run loops, main, enhanced_main all share the cache) every
+# reload and write happens under an flock on CACHE_FILE + ".lock"; the cache file itself
+# is replaced on compaction, so a lock on it would not outlive the next snapshot
+# In-memory copy of the cache, reloaded whenever the file's (mtime_ns, size, inode) changes
+_TRADES: Optional[List[Dict]] = None
+_FILE_SIG: Optional[tuple] = None
+_FILE_LOCK_DEPTH = 0
+# Indexes over _TRADES: trade_id -> trade, (symbol, direction) -> trade_ids
+_BY_ID: Dict[str, Dict] = {}
+_BY_SYM_DIR: Dict[tuple, set] = {}
+# Column (SoA) view over _TRADES for vectorised scans; derived, dropped on any mutation
+_COLUMNS: Optional[Dict] = None
+# Mutations mark the cache dirty; a background thread coalesces them into one write
+FLUSH_INTERVAL_S = 0.1
+# Back-off before retrying a flush that failed (disk full, permissions, ...)
+FLUSH_RETRY_S = 5.0
+_dirty = threading.Event()
+_flush_thread: Optional[threading.Thread] = None
+# Records not yet appended, and how many the file holds since its last snapshot
+# (None = the next flush writes a snapshot; see _load_raw)
+_PENDING_OPS: List[Dict] = []
+_LOG_RECORDS: Optional[int] = None
+# Non-blocking lock attempts before falling back to a blocking LOCK_EX
+LOCK_RETRIES = 5
+# Scans switch to NumPy column arrays (see _columns) at this many trades
+VECTORIZE_MIN_TRADES = 1000
 
-def load_trades():
-    """Load active trades from cache file with file locking"""
-    if os.path.exists(CACHE_FILE):
+def _lock_exclusive(fd):
+    """Acquire an exclusive flock, probing with LOCK_NB and backing off before blocking"""
+    for attempt in range(LOCK_RETRIES):
         try:
-            with open(CACHE_FILE, "r") as f:
-                # Apply file lock (non-blocking read lock)
-                try:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH)  # Shared lock for reading
-                    trades = json.load(f)
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # Release lock
-                    # Ensure trades is a list
-                    return trades if isinstance(trades, list) else []
-                except (IOError, OSError):
-                    # File locking not supported on this system (Windows), fall back to no lock
-                    trades = json.load(f)
-                    return trades if isinstance(trades, list) else []
-        except (json.JSONDecodeError, FileNotFoundError):
-            print("[CACHE] Warning: Could not load trades cache, starting fresh")
-            return []
-    return []
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            time.sleep((2 ** attempt) * 1e-3)
+    print("[CACHE] ⚠️ Cache file lock contended; waiting for exclusive lock")
+    fcntl.flock(fd, fcntl.LOCK_EX)
 
-def save_trades(trades):
-    """Save trades with atomic write and file locking"""
-    with _cache_lock:  # Thread-level lock first
+def _encode_record(record, fmt: Optional[str] = None) -> bytes:
+    """Encode one log record in the given format (default CACHE_FORMAT)"""
+    if (fmt or CACHE_FORMAT) == "msgpack":
+        body = msgpack.packb(record, use_bin_type=True)
+        return _FRAME.pack(len(body)) + body
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+def _decode_records(data, fmt: Optional[str] = None) -> List:
+    """Split cache file bytes (or an mmap of them) into log records, skipping a torn final record"""
+    return _decode_log(data, fmt)[0]
+
+def _decode_log(data, fmt: Optional[str] = None) -> Tuple[List, bool]:
+    """(_decode_records, whether the file can take appends: False after a torn final record or
+    for a pretty-printed legacy array, which must be rewritten as a snapshot first)"""
+    view = memoryview(data)
+    size = len(view)
+    records = []
+    pos = 0
+    if (fmt or CACHE_FORMAT) == "msgpack":
+        while pos < size:
+            end = -1
+            if size - pos >= _FRAME.size:
+                start = pos + _FRAME.size
+                end = start + _FRAME.unpack_from(view, pos)[0]
+            if end < 0 or end > size:
+                print("[CACHE] ⚠️ Ignoring truncated record at end of trades cache")
+                return records, False
+            records.append(msgpack.unpackb(view[start:end], raw=False))
+            pos = end
+        return records, True
+
+    parse = orjson.loads if orjson is not None else (lambda b: json.loads(bytes(b)))
+    while pos < size:
+        end = data.find(b"\n", pos)
+        if end == -1:
+            end = size
+        line = view[pos:end]
+        pos = end + 1
+        if not len(line):
+            continue
         try:
-            if not isinstance(trades, list):
-                trades = []
-            tmp = CACHE_FILE + ".tmp"
-            with open(tmp, "w") as f:
-                # Apply exclusive lock for writing
-                try:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock
-                    json.dump(trades, f, indent=2)
-                    f.flush()  # Ensure data is written
-                    os.fsync(f.fileno())  # Force write to disk
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # Release lock
-                except (IOError, OSError):
-                    # File locking not supported, just write
-                    json.dump(trades, f, indent=2)
-            os.replace(tmp, CACHE_FILE)  # atomic on posix/nt
+            records.append(parse(line))
+        except ValueError:
+            if not records and view[:1] == b"[":
+                return [parse(view)], False  # legacy pretty-printed array
+            if pos >= size:
+                print("[CACHE] ⚠️ Ignoring truncated record at end of trades cache")
+                return records, False
+            raise
+    return records, True
+
+def _apply_ops(trades: List[Dict], records: List) -> List[Dict]:
+    """Replay log records on top of a trade list; adding a trade_id that is already present is a no-op"""
+    trades = list(trades)
+    ids = {str(t.get("trade_id")) for t in trades}
+    for record in records:
+        if isinstance(record, list):  # snapshot
+            trades = list(record)
+            ids = {str(t.get("trade_id")) for t in trades}
+            continue
+        op = record.get("op")
+        if op == "add":
+            trade_id = str(record["trade"].get("trade_id"))
+            if trade_id not in ids:  # two processes may both log the same fill
+                trades.append(record["trade"])
+                ids.add(trade_id)
+        elif op == "remove":
+            trade_id = str(record["trade_id"])
+            trades = [t for t in trades if str(t.get("trade_id")) != trade_id]
+            ids.discard(trade_id)
+        elif op == "update":
+            trade_id = str(record["trade_id"])
+            trades = [{**t, **record["updates"]} if str(t.get("trade_id")) == trade_id else t for t in trades]
+    return trades
+
+def _loads(data, fmt: Optional[str] = None) -> List[Dict]:
+    """Decode and replay a whole cache file"""
+    return _apply_ops([], _decode_records(data, fmt))
+
+def _dumps(trades) -> bytes:
+    """Encode trades as a single snapshot record"""
+    if CACHE_PRETTY:
+        return json.dumps(trades, indent=2).encode("utf-8") + b"\n"
+    return _encode_record(trades)
+
+def _migrate_legacy_cache():
+    """One-shot move from active_trades.json to the MessagePack cache, keeping a .bak"""
+    if CACHE_FILE == LEGACY_CACHE_FILE:
+        return
+    try:
+        with open(LEGACY_CACHE_FILE, "rb") as f:
+            if os.path.exists(CACHE_FILE):
+                return  # already migrated; the legacy file was restored or re-created by hand
+            trades = _loads(f.read(), fmt="json")
+        _save_raw(trades if isinstance(trades, list) else [])
+        os.replace(LEGACY_CACHE_FILE, LEGACY_CACHE_FILE + ".bak")
+        print(f"[CACHE] 📦 Migrated {LEGACY_CACHE_FILE} to {CACHE_FILE}")
+    except FileNotFoundError:
+        return  # nothing to migrate (the usual case)
+    except (OSError, ValueError) as e:
+        print(f"[CACHE] ⚠️ Could not migrate legacy trades cache: {e}")
+
+def _read_mapped(f):
+    """Decode and replay an open cache file through a read-only mmap instead of copying it into
+    bytes; returns (trades, log records since the last snapshot, or None if it must be rewritten)"""
+    if os.fstat(f.fileno()).st_size == 0:
+        raise ValueError("empty cache file")  # mmap cannot map zero bytes
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        records, appendable = _decode_log(mm)
+        snapshot = max((i for i, r in enumerate(records) if isinstance(r, list)), default=-1)
+        return _apply_ops([], records), (len(records) - snapshot - 1 if appendable else None)
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass  # a decode error's traceback still holds a view; GC unmaps it
+
+@contextmanager
+def _file_lock():
+    """Hold the cross-process cache lock (flock on CACHE_FILE + ".lock"); caller holds _cache_lock.
+    Re-entrant, since two flocks from one process on the same file would deadlock each other
+    (e.g. the SIGTERM flush interrupting a reload)."""
+    global _FILE_LOCK_DEPTH
+    if _FILE_LOCK_DEPTH:
+        _FILE_LOCK_DEPTH += 1
+        try:
+            yield
+        finally:
+            _FILE_LOCK_DEPTH -= 1
+        return
+    try:
+        fd = os.open(CACHE_FILE + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        print(f"[CACHE] ⚠️ Cannot open cache lock file, continuing unlocked: {e}")
+        fd = None
+    _FILE_LOCK_DEPTH = 1
+    try:
+        if fd is not None:
+            try:
+                _lock_exclusive(fd)
+            except (IOError, OSError):
+                pass  # File locking not supported on this system (Windows), fall back to no lock
+        yield
+    finally:
+        _FILE_LOCK_DEPTH = 0
+        if fd is not None:
+            os.close(fd)  # closing the descriptor releases the flock
+
+def _load_raw():
+    """Read the raw trade list from the cache file (caller holds _file_lock), with the number of
+    log records appended since its last snapshot (None when the next write must be a snapshot)"""
+    _migrate_legacy_cache()
+    try:
+        f = open(CACHE_FILE, "rb")  # EAFP: one open() instead of exists() + open()
+    except FileNotFoundError:
+        return [], None
+    try:
+        with f:
+            return _read_mapped(f)
+    except _DECODE_ERRORS:
+        print("[CACHE] Warning: Could not load trades cache, starting fresh")
+        return [], None
+
+def _save_raw(trades):
+    """Write the trade list to the cache file with atomic replace (caller holds _file_lock)"""
+    payload = _dumps(trades)  # encode once, then a single write()
+    tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()  # Ensure data is written
+        os.fsync(f.fileno())  # Force write to disk
+    os.replace(tmp, CACHE_FILE)  # atomic on posix/nt
+
+def _append_raw(records):
+    """Append log records to the cache file in a single write (caller holds _file_lock)"""
+    payload = b"".join(_encode_record(r) for r in records)  # encode once, then a single write()
+    with open(CACHE_FILE, "ab") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _file_sig() -> Optional[tuple]:
+    """(mtime_ns, size, inode) of the cache file, or None if it does not exist.
+    Size and inode catch same-tick appends and replaces that a coarse mtime would miss."""
+    try:
+        st = os.stat(CACHE_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _index_add(trade: Dict):
+    global _COLUMNS
+    _COLUMNS = None
+    trade_id = str(trade.get("trade_id"))
+    _BY_ID[trade_id] = trade
+    _BY_SYM_DIR.setdefault((trade.get("symbol"), trade.get("direction")), set()).add(trade_id)
+
+def _index_remove(trade: Dict):
+    global _COLUMNS
+    _COLUMNS = None
+    trade_id = str(trade.get("trade_id"))
+    _BY_ID.pop(trade_id, None)
+    key = (trade.get("symbol"), trade.get("direction"))
+    ids = _BY_SYM_DIR.get(key)
+    if ids is not None:
+        ids.discard(trade_id)
+        if not ids:
+            del _BY_SYM_DIR[key]
+
+def _set_trades(trades: List[Dict]):
+    """Replace the in-memory trades and rebuild the indexes in one pass"""
+    global _TRADES, _COLUMNS
+    _TRADES = trades
+    _COLUMNS = None
+    _BY_ID.clear()
+    _BY_SYM_DIR.clear()
+    for trade in trades:
+        # A few dozen distinct symbols repeat across every trade; share one string each
+        for key in ("symbol", "symbol_norm", "direction"):
+            value = trade.get(key)
+            if isinstance(value, str):
+                trade[key] = sys.intern(value)
+        _index_add(trade)
+
+def _invalidate():
+    """Drop the in-memory copy (and unflushed changes) so the next load re-reads the cache file"""
+    global _TRADES, _FILE_SIG, _LOG_RECORDS, _COLUMNS
+    with _cache_lock:
+        _TRADES = None
+        _COLUMNS = None
+        _FILE_SIG = None
+        _LOG_RECORDS = None
+        _BY_ID.clear()
+        _BY_SYM_DIR.clear()
+        _PENDING_OPS.clear()
+        _dirty.clear()
+
+def _reload_if_changed():
+    """Re-read the cache file if another writer changed it, replaying our unflushed records
+    on top (caller holds _cache_lock and _file_lock)"""
+    global _FILE_SIG, _LOG_RECORDS
+    sig = _file_sig()
+    if _TRADES is not None and sig == _FILE_SIG:
+        return
+    trades, log_records = _load_raw()
+    # Ensure trades is a list
+    _set_trades(_apply_ops(trades if isinstance(trades, list) else [], _PENDING_OPS))
+    _FILE_SIG = sig
+    _LOG_RECORDS = log_records
+
+def _ensure_loaded():
+    """Refresh the in-memory trades if the cache file changed (caller holds _cache_lock)"""
+    if _TRADES is not None and _file_sig() == _FILE_SIG:
+        return
+    with _file_lock():
+        _reload_if_changed()
+
+def _columns() -> Optional[Dict]:
+    """NumPy column arrays over _TRADES, or None for small caches or without numpy (caller holds _cache_lock)"""
+    global _COLUMNS
+    if np is None or len(_TRADES) < VECTORIZE_MIN_TRADES:
+        return None
+    if _COLUMNS is None:
+        # Parsed with _safe_iso like the per-trade path: malformed and tz-aware timestamps
+        # (which cannot be aged against naive local time) become NaT, i.e. age None
+        parsed = (_safe_iso(t.get("timestamp")) for t in _TRADES)
+        timestamps = np.array([ts if ts is not None and ts.tzinfo is None else None for ts in parsed],
+                              dtype="datetime64[us]")
+        _COLUMNS = {
+            "symbol": np.array([t.get("symbol") for t in _TRADES], dtype=object),
+            "direction": np.array([t.get("direction") for t in _TRADES], dtype=object),
+            "timestamp": timestamps,
+        }
+    return _COLUMNS
+
+def _persist():
+    """Append pending records, or compact to a snapshot, on disk (caller holds _cache_lock).
+    Under the file lock the cache is re-validated first, so records another process wrote
+    since our last load are merged in rather than overwritten."""
+    global _FILE_SIG, _LOG_RECORDS
+    ops = list(_PENDING_OPS)
+    try:
+        with _file_lock():
+            _reload_if_changed()
+            snapshot = any(isinstance(r, list) for r in ops)  # save_trades replaced everything
+            if CACHE_PRETTY or snapshot or _LOG_RECORDS is None or _LOG_RECORDS + len(ops) > max(COMPACT_MIN_RECORDS, COMPACT_FACTOR * len(_TRADES)):
+                _save_raw(_TRADES)
+                _LOG_RECORDS = 0
+            elif ops:
+                _append_raw(ops)
+                _LOG_RECORDS += len(ops)
+            _FILE_SIG = _file_sig()
+        del _PENDING_OPS[:len(ops)]
+        return True
+    except Exception as e:
+        _LOG_RECORDS = None  # next flush rewrites the full state
+        _dirty.set()  # keep retrying; the records stay queued for the merge
+        print(f"[CACHE] Error saving trades: {e}")
+        return False
+
+def _record_op(record: Dict):
+    """Queue a log record for the next flush (caller holds _cache_lock)"""
+    _PENDING_OPS.append(record)
+    _schedule_flush()
+
+def _flush_loop():
+    while True:
+        _dirty.wait()
+        time.sleep(FLUSH_INTERVAL_S)  # let a burst of mutations land first
+        if not flush():
+            time.sleep(FLUSH_RETRY_S)
+
+def _schedule_flush():
+    """Mark the cache dirty and make sure the flush thread is running (caller holds _cache_lock)"""
+    global _flush_thread
+    _dirty.set()
+    if _flush_thread is None or not _flush_thread.is_alive():
+        _flush_thread = threading.Thread(target=_flush_loop, name="trade-cache-flush", daemon=True)
+        _flush_thread.start()
+
+def flush() -> bool:
+    """Write any pending in-memory changes to disk immediately; False if the write failed"""
+    with _cache_lock:
+        if not _dirty.is_set():
+            return True
+        _dirty.clear()
+        return _persist()
+
+# Pending changes must survive interpreter shutdown (the flush thread is a daemon)
+atexit.register(flush)
+
+# Installed by entrypoints only (see install_sigterm_flush): library imports leave the process's
+# signal handling alone
+_PREV_SIGTERM = None
+_SIGTERM_HOOKS: List = []
+
+def _flush_on_sigterm(signum, frame):
+    """SIGTERM (docker stop) skips atexit: flush, then defer to the previous handler or exit"""
+    for hook in [flush] + _SIGTERM_HOOKS:
+        try:
+            hook()
         except Exception as e:
-            print(f"[CACHE] Error saving trades: {e}")
+            print(f"[CACHE] Error in SIGTERM flush: {e}")
+    if callable(_PREV_SIGTERM):
+        _PREV_SIGTERM(signum, frame)
+    elif _PREV_SIGTERM != signal.SIG_IGN:
+        raise SystemExit(128 + signum)  # unwinds normally, so the other atexit hooks run too
+
+def install_sigterm_flush(*hooks):
+    """Flush the cache, then run `hooks` (e.g. trader.flush_pending_persists), on SIGTERM before
+    the previous handler runs or the process exits. For process entrypoints; call from the main thread."""
+    global _PREV_SIGTERM
+    _SIGTERM_HOOKS.extend(h for h in hooks if h not in _SIGTERM_HOOKS)
+    if signal.getsignal(signal.SIGTERM) is not _flush_on_sigterm:
+        _PREV_SIGTERM = signal.signal(signal.SIGTERM, _flush_on_sigterm)
+
+def load_trades():
+    """Load active trades, re-reading the cache file only when it changed on disk"""
+    with _cache_lock:
+        _ensure_loaded()
+        return [dict(t) for t in _TRADES]
+
+def save_trades(trades):
+    """Replace the cached trades; the next flush writes them as a fresh snapshot"""
+    with _cache_lock:  # Thread-level lock first
+        if not isinstance(trades, list):
+            trades = []
+        _set_trades(list(trades))
+        _PENDING_OPS.clear()
+        _record_op([dict(t) for t in trades])  # a snapshot record supersedes everything before it
+
+def _remove_trades(trade_ids) -> int:
+    """Drop trades by id as individual remove records, so concurrent adds from other
+    processes survive the merge (unlike a save_trades snapshot); returns how many were cached"""
+    with _cache_lock:
+        _ensure_loaded()
+        removed = [_BY_ID[tid] for tid in {str(t) for t in trade_ids} if tid in _BY_ID]
+        if not removed:
+            return 0
+        gone = {str(t.get("trade_id")) for t in removed}
+        _TRADES[:] = [t for t in _TRADES if str(t.get("trade_id")) not in gone]
+        for trade in removed:
+            _index_remove(trade)
+            _record_op({"op": "remove", "trade_id": str(trade.get("trade_id"))})
+        return len(removed)
 
 
 # Legacy function names for backward compatibility
@@ -61,56 +484,61 @@ def save_cache(trades):
     save_trades(trades)
 
 def add_trade(symbol, direction, entry_price, trade_id, **additional_data):
-    trades = load_trades()
-    clean_symbol = symbol.replace("_", "")
+    clean_symbol = sys.intern(symbol.replace("_", ""))
 
     # SAFETY ASSERTION: Validate trade_id is not empty or "unknown"
     if not trade_id or trade_id == "unknown":
         raise ValueError(f"Cannot add trade with invalid trade_id: {trade_id}")
 
-    # If we already have this trade_id, skip
-    if any(str(t.get("trade_id")) == str(trade_id) for t in trades if t.get("trade_id")):
-        print(f"[CACHE] ⚠️ Duplicate trade_id {trade_id}; not adding.")
-        return False
+    with _cache_lock:
+        _ensure_loaded()
 
-    # Allow same symbol+direction when adding a pyramid child (parent_trade_id set)
-    is_pyramid_add = "parent_trade_id" in additional_data
-    if not is_pyramid_add:
-        # Optional: prevent multiple positions same symbol+direction (except pyramid adds)
-        if any(t.get("symbol") == clean_symbol and t.get("direction") == direction.lower() for t in trades):
-            print(f"[CACHE] ⚠️ Existing {clean_symbol} {direction.upper()} already active; not adding.")
+        # If we already have this trade_id, skip
+        if str(trade_id) in _BY_ID:
+            print(f"[CACHE] ⚠️ Duplicate trade_id {trade_id}; not adding.")
             return False
 
-    trade = {
-        "symbol": clean_symbol,
-        "instrument": symbol,
-        "direction": direction.lower(),
-        "side": direction.lower(),
-        "entry_price": float(entry_price),
-        "trade_id": str(trade_id),
-        "timestamp": datetime.now().isoformat(),
-        **additional_data
-    }
-    trades.append(trade)
-    save_trades(trades)
+        # Allow same symbol+direction when adding a pyramid child (parent_trade_id set)
+        is_pyramid_add = "parent_trade_id" in additional_data
+        if not is_pyramid_add:
+            # Optional: prevent multiple positions same symbol+direction (except pyramid adds)
+            if (clean_symbol, direction.lower()) in _BY_SYM_DIR:
+                print(f"[CACHE] ⚠️ Existing {clean_symbol} {direction.upper()} already active; not adding.")
+                return False
+
+        side = sys.intern(direction.lower())
+        trade = {
+            "symbol": clean_symbol,
+            "symbol_norm": sys.intern(clean_symbol.upper()),  # matches trader._normalize_symbol
+            "instrument": symbol,
+            "direction": side,
+            "side": side,
+            "entry_price": float(entry_price),
+            "trade_id": str(trade_id),
+            "timestamp": datetime.now().isoformat(),
+            **additional_data
+        }
+        _TRADES.append(trade)
+        _index_add(trade)
+        _record_op({"op": "add", "trade": dict(trade)})
     print(f"[CACHE] ✅ Added trade: {clean_symbol} {direction.upper()} (ID: {trade_id})")
     return True
 
 def remove_trade(trade_id):
     """Remove a trade from the cache"""
-    trades = load_trades()
-    original_count = len(trades)
-    
-    # Remove trade with matching ID
-    trades = [t for t in trades if str(t.get("trade_id")) != str(trade_id)]
-    
-    if len(trades) < original_count:
-        save_trades(trades)
-        print(f"[CACHE] 🗑️ Removed trade ID: {trade_id}")
-        return True
-    else:
-        print(f"[CACHE] ⚠️ Trade ID {trade_id} not found in cache")
-        return False
+    with _cache_lock:
+        _ensure_loaded()
+        trade = _BY_ID.get(str(trade_id))
+        if trade is None:
+            print(f"[CACHE] ⚠️ Trade ID {trade_id} not found in cache")
+            return False
+
+        # Remove trade with matching ID
+        _TRADES[:] = [t for t in _TRADES if str(t.get("trade_id")) != str(trade_id)]
+        _index_remove(trade)
+        _record_op({"op": "remove", "trade_id": str(trade_id)})
+    print(f"[CACHE] 🗑️ Removed trade ID: {trade_id}")
+    return True
 
 def get_active_trades() -> List[Dict]:
     """Get all active trades"""
@@ -118,27 +546,30 @@ def get_active_trades() -> List[Dict]:
 
 def get_trade_by_id(trade_id: str) -> Optional[Dict]:
     """Get a specific trade by ID"""
-    trades = load_trades()
-    for trade in trades:
-        if str(trade.get("trade_id")) == str(trade_id):
-            return trade
-    return None
+    with _cache_lock:
+        _ensure_loaded()
+        trade = _BY_ID.get(str(trade_id))
+        return dict(trade) if trade is not None else None
 
 def get_trades_by_symbol(symbol: str) -> List[Dict]:
     """Get all trades for a specific symbol"""
-    trades = load_trades()
     clean_symbol = symbol.replace("_", "")
-    return [t for t in trades if t.get("symbol") == clean_symbol]
+    with _cache_lock:
+        _ensure_loaded()
+        columns = _columns()
+        if columns is not None:
+            return [dict(_TRADES[i]) for i in np.flatnonzero(columns["symbol"] == clean_symbol)]
+        return [dict(t) for t in _TRADES if t.get("symbol") == clean_symbol]
 
 def is_trade_active(symbol, direction=None):
     """Check if there's an active trade for a symbol/direction"""
-    trades = load_trades()
     clean_symbol = symbol.replace("_", "")
-    
-    if direction:
-        return any(t.get("symbol") == clean_symbol and t.get("direction") == direction.lower() for t in trades)
-    else:
-        return any(t.get("symbol") == clean_symbol for t in trades)
+    with _cache_lock:
+        _ensure_loaded()
+        if direction:
+            return (clean_symbol, direction.lower()) in _BY_SYM_DIR
+        else:
+            return any(sym == clean_symbol for sym, _ in _BY_SYM_DIR)
 
 def get_active_pairs() -> List[str]:
     """Get list of currently active trading pairs"""
@@ -147,69 +578,94 @@ def get_active_pairs() -> List[str]:
 
 def update_trade(trade_id: str, updates: Dict) -> bool:
     """Update an existing trade with new data"""
-    trades = load_trades()
-    
+    with _cache_lock:
+        _ensure_loaded()
+        trade = _BY_ID.get(str(trade_id))
+        if trade is None:
+            print(f"[CACHE] ⚠️ Cannot update - trade {trade_id} not found")
+            return False
+
+        _index_remove(trade)
+        trade.update(updates)
+        _index_add(trade)
+        _record_op({"op": "update", "trade_id": str(trade_id), "updates": dict(updates)})
+    print(f"[CACHE] 🔄 Updated trade {trade_id}: {list(updates.keys())}")
+    return True
+
+def _safe_iso(value) -> Optional[datetime]:
+    """Parse an ISO timestamp, or None if it is missing or malformed"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _trade_ages_hours(trades: List[Dict], current_time: datetime, timestamps=None) -> List[Optional[float]]:
+    """Age of each trade in hours, or None where the timestamp does not parse"""
+    if timestamps is not None:  # datetime64 column from _columns()
+        ages = (np.datetime64(current_time, "us") - timestamps) / np.timedelta64(1, "h")
+        return [None if invalid else age for age, invalid in zip(ages.tolist(), np.isnat(timestamps).tolist())]
+
+    ages = []
     for trade in trades:
-        if str(trade.get("trade_id")) == str(trade_id):
-            trade.update(updates)
-            save_trades(trades)
-            print(f"[CACHE] 🔄 Updated trade {trade_id}: {list(updates.keys())}")
-            return True
-    
-    print(f"[CACHE] ⚠️ Cannot update - trade {trade_id} not found")
-    return False
+        trade_time = _safe_iso(trade.get("timestamp"))
+        try:
+            ages.append((current_time - trade_time).total_seconds() / 3600)
+        except TypeError:  # unparseable, or tz-aware vs naive
+            ages.append(None)
+    return ages
 
 def cleanup_stale_trades(max_age_hours: int = 72):
     """Remove trades older than specified hours (safety cleanup)"""
-    trades = load_trades()
-    current_time = datetime.now()
+    with _cache_lock:
+        _ensure_loaded()
+        trades = [dict(t) for t in _TRADES]
+        columns = _columns()
+        ages = _trade_ages_hours(trades, datetime.now(), columns and columns["timestamp"])
     cleaned_trades = []
     
-    for trade in trades:
-        try:
-            trade_time = datetime.fromisoformat(trade.get("timestamp", ""))
-            age_hours = (current_time - trade_time).total_seconds() / 3600
-            
-            if age_hours <= max_age_hours:
-                cleaned_trades.append(trade)
-            else:
-                print(f"[CACHE] 🧹 Removed stale trade: {trade.get('symbol')} (age: {age_hours:.1f}h)")
-        except:
-            # Keep trades with invalid timestamps (better safe than sorry)
+    for trade, age_hours in zip(trades, ages):
+        # Keep trades with invalid timestamps (better safe than sorry)
+        if age_hours is None or age_hours <= max_age_hours:
             cleaned_trades.append(trade)
+        else:
+            print(f"[CACHE] 🧹 Removed stale trade: {trade.get('symbol')} (age: {age_hours:.1f}h)")
     
     if len(cleaned_trades) != len(trades):
-        save_trades(cleaned_trades)
-        return len(trades) - len(cleaned_trades)
+        kept = {str(t.get("trade_id")) for t in cleaned_trades}
+        return _remove_trades(t.get("trade_id") for t in trades if str(t.get("trade_id")) not in kept)
     
     return 0
 
 def get_cache_stats() -> Dict:
     """Get statistics about the trade cache"""
-    trades = load_trades()
-    
-    stats = {
-        "total_trades": len(trades),
-        "active_pairs": len(get_active_pairs()),
-        "buy_trades": len([t for t in trades if t.get("direction") == "buy"]),
-        "sell_trades": len([t for t in trades if t.get("direction") == "sell"]),
-        "oldest_trade": None,
-        "newest_trade": None
-    }
-    
-    if trades:
-        timestamps = []
-        for trade in trades:
-            try:
-                timestamps.append(datetime.fromisoformat(trade.get("timestamp", "")))
-            except:
+    with _cache_lock:
+        _ensure_loaded()
+        # Direction counts and pairs come straight from the (symbol, direction) index
+        dir_counts = Counter()
+        pairs = set()
+        for (symbol, direction), trade_ids in _BY_SYM_DIR.items():
+            dir_counts[direction] += len(trade_ids)
+            if symbol:
+                pairs.add(symbol)
+        
+        oldest = newest = None
+        for trade in _TRADES:
+            ts = _safe_iso(trade.get("timestamp"))
+            if ts is None:
                 continue
+            if oldest is None or ts < oldest:
+                oldest = ts
+            if newest is None or ts > newest:
+                newest = ts
         
-        if timestamps:
-            stats["oldest_trade"] = min(timestamps).isoformat()
-            stats["newest_trade"] = max(timestamps).isoformat()
-    
-    return stats
+        return {
+            "total_trades": len(_TRADES),
+            "active_pairs": len(pairs),
+            "buy_trades": dir_counts["buy"],
+            "sell_trades": dir_counts["sell"],
+            "oldest_trade": oldest.isoformat() if oldest else None,
+            "newest_trade": newest.isoformat() if newest else None
+        }
 
 def sync_cache_with_broker(client, account_id) -> int:
     """
@@ -235,21 +691,17 @@ def sync_cache_with_broker(client, account_id) -> int:
             
             # Get cached trades atomically (within lock)
             cached_trades = load_trades()  # Load with lock
-            removed_trade_ids = []
             
             # Find trades that exist in cache but not in live account
-            for cached_trade in cached_trades:
-                trade_id = cached_trade.get("trade_id")
-                if trade_id and trade_id not in live_trades:
-                    removed_trade_ids.append(trade_id)
-                    print(f"[CACHE] 🔍 Trade {trade_id} not found in broker - marking for removal")
+            stale = {
+                str(trade_id) for trade_id in (t.get("trade_id") for t in cached_trades)
+                if trade_id and str(trade_id) not in live_trades
+            }
             
             # Remove all closed trades in one atomic operation
-            if removed_trade_ids:
-                updated_trades = [t for t in cached_trades if str(t.get("trade_id")) not in removed_trade_ids]
-                save_trades(updated_trades)  # Save with lock
-                removed_count = len(removed_trade_ids)
-                print(f"[CACHE] ✅ Synced cache with broker: removed {removed_count} closed trade(s)")
+            if stale:
+                removed_count = _remove_trades(stale)  # per-trade removes merge with other writers
+                print(f"[CACHE] ✅ Synced cache with broker: removed {removed_count} closed trade(s): {', '.join(sorted(stale))}")
                 return removed_count
             else:
                 print(f"[CACHE] ✅ Cache sync complete: all cached trades are still active")
@@ -3,73 +3,113 @@ Centralized email sending logic for trading bot.
 Separates admin diagnostic emails from user-facing trade signals.
 """
 
+import json
 import os
-from typing import Dict, List, Optional, Any
-from email_utils import send_email
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple
 
-# Cache for admin emails (from env var)
-_ADMIN_EMAILS_CACHE: Optional[List[str]] = None
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from email_utils import body_digest, send_email
 
 # Cache for user emails (from API)
 _USER_EMAILS_CACHE: Optional[List[str]] = None
 _USER_EMAILS_CACHE_TIMESTAMP: Optional[float] = None
 _CACHE_TTL_SECONDS = 300  # 5 minutes
+# Held while a background refresh of the user-email cache is running
+_USER_EMAILS_REFRESH_LOCK = threading.Lock()
+# (user email list it was built from, admin env fingerprint, user emails minus admins)
+_SIGNAL_RECIPIENTS_CACHE: Optional[Tuple[List[str], Tuple[str, str], List[str]]] = None
 
 
-def get_admin_emails() -> List[str]:
+def _build_session() -> requests.Session:
+    """Keep-alive session for the entitlements API, with retries on transient gateway errors."""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip"})
+    return session
+
+
+# Reused across TTL refreshes so each refresh skips the TCP/TLS handshake
+_SESSION = _build_session()
+
+# Bounded pool so recipients are sent to concurrently instead of one SMTP round-trip at a time
+_EMAIL_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("EMAIL_WORKERS", "8")), thread_name_prefix="email")
+# Caps in-flight SMTP sends; each slot is held a little past its send to pace the provider
+_RATE_LIMIT = threading.Semaphore(int(os.getenv("EMAIL_MAX_IN_FLIGHT", "4")))
+_SEND_SPACING_SECONDS = 0.05
+_SEND_TIMEOUT_SECONDS = 30
+
+
+def _send_paced(subject: str, body: str, email: str, body_hash: str) -> None:
+    with _RATE_LIMIT:
+        send_email(subject, body, to=email, body_hash=body_hash)
+        time.sleep(_SEND_SPACING_SECONDS)  # Small delay to avoid rate limits
+
+
+def _dispatch(subject: str, body: str, recipients: List[str], label: str) -> int:
+    """Send the same email to every recipient on the pool; returns how many sends completed."""
+    # The body is formatted once by the caller; hash it once too instead of per recipient
+    body_hash = body_digest(body)
+    futures = [(email, _EMAIL_POOL.submit(_send_paced, subject, body, email, body_hash)) for email in recipients]
+    sent = 0
+    for email, future in futures:
+        try:
+            future.result(timeout=_SEND_TIMEOUT_SECONDS)
+            sent += 1
+        except Exception as e:
+            print(f"[EMAIL] ⚠️ Failed to send {label} to {email}: {e}")
+    return sent
+
+
+@lru_cache(maxsize=4)
+def _parse_admin_emails(superadmin_env: str, admins_env: str) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
     """
-    Get super-admin email addresses from SIGNAL_SUPERADMIN_EMAIL or ADMIN_EMAILS env var.
-    These emails receive ALL diagnostic emails (accepted, rejected, validation errors).
-    
-    Priority: SIGNAL_SUPERADMIN_EMAIL > ADMIN_EMAILS
+    Parse admin emails once per distinct (SIGNAL_SUPERADMIN_EMAIL, ADMIN_EMAILS) value.
+    Returns (ordered emails, set of the same emails for membership checks).
     """
-    global _ADMIN_EMAILS_CACHE
-    
-    if _ADMIN_EMAILS_CACHE is not None:
-        return _ADMIN_EMAILS_CACHE
-    
     # Check for dedicated super-admin email first
-    superadmin = os.getenv("SIGNAL_SUPERADMIN_EMAIL", "").strip()
+    superadmin = superadmin_env.strip()
     if superadmin:
-        _ADMIN_EMAILS_CACHE = [superadmin.lower()]
-        return _ADMIN_EMAILS_CACHE
-    
-    # Fall back to ADMIN_EMAILS
-    admin_csv = os.getenv("ADMIN_EMAILS", "")
-    if not admin_csv:
-        _ADMIN_EMAILS_CACHE = []
-        return []
+        emails: Tuple[str, ...] = (superadmin.lower(),)
+        return emails, frozenset(emails)
     
-    # Parse comma-separated emails
-    emails = []
-    seen = set()
-    for email in admin_csv.split(","):
-        email = email.strip().lower()
-        if email and email not in seen:
-            emails.append(email)
-            seen.add(email)
-    
-    _ADMIN_EMAILS_CACHE = emails
-    return emails
+    # Fall back to ADMIN_EMAILS (comma-separated), deduped preserving order
+    emails = tuple(dict.fromkeys(e for e in (part.strip().lower() for part in admins_env.split(",")) if e))
+    return emails, frozenset(emails)
 
 
-def get_user_emails() -> List[str]:
+def _admin_env_fingerprint() -> Tuple[str, str]:
+    return os.getenv("SIGNAL_SUPERADMIN_EMAIL", ""), os.getenv("ADMIN_EMAILS", "")
+
+
+def get_admin_emails() -> List[str]:
     """
-    Get normal signal recipient emails from /access/paid-emails API.
-    These users only receive clean signal emails for executed trades (OPEN signals).
-    Returns empty list if API is unavailable.
+    Get super-admin email addresses from SIGNAL_SUPERADMIN_EMAIL or ADMIN_EMAILS env var.
+    These emails receive ALL diagnostic emails (accepted, rejected, validation errors).
+    
+    Priority: SIGNAL_SUPERADMIN_EMAIL > ADMIN_EMAILS
     """
+    return list(_parse_admin_emails(*_admin_env_fingerprint())[0])
+
+
+def get_admin_email_set() -> FrozenSet[str]:
+    """Set view of get_admin_emails(), cached with it."""
+    return _parse_admin_emails(*_admin_env_fingerprint())[1]
+
+
+def _fetch_user_emails() -> List[str]:
+    """Fetch, normalize and cache user emails from the API. Falls back to the last cached list."""
     global _USER_EMAILS_CACHE, _USER_EMAILS_CACHE_TIMESTAMP
     
-    import time
-    
-    # Return cached result if still valid
-    if _USER_EMAILS_CACHE is not None and _USER_EMAILS_CACHE_TIMESTAMP is not None:
-        age = time.time() - _USER_EMAILS_CACHE_TIMESTAMP
-        if age < _CACHE_TTL_SECONDS:
-            return _USER_EMAILS_CACHE
-    
-    # Fetch from API
     api_base = os.getenv("API_BASE_URL", "").rstrip("/")
     if not api_base:
         print("[EMAIL] ⚠️ API_BASE_URL not set; cannot fetch user emails from API")
@@ -78,8 +118,7 @@ def get_user_emails() -> List[str]:
         return []
     
     try:
-        import requests
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{api_base}/access/paid-emails",
             timeout=10,
         )
@@ -96,8 +135,8 @@ def get_user_emails() -> List[str]:
                 normalized.append(email_lower)
                 seen.add(email_lower)
         
-        _USER_EMAILS_CACHE = normalized
-        _USER_EMAILS_CACHE_TIMESTAMP = time.time()
+        # Swap both globals together so readers never see a half-updated cache
+        _USER_EMAILS_CACHE, _USER_EMAILS_CACHE_TIMESTAMP = normalized, time.time()
         return normalized
     except Exception as e:
         print(f"[EMAIL] ⚠️ Failed to fetch user emails from API: {e}")
@@ -107,6 +146,61 @@ def get_user_emails() -> List[str]:
         return []
 
 
+def _refresh_user_emails_in_background() -> None:
+    """Start at most one background refresh of the user-email cache."""
+    if not _USER_EMAILS_REFRESH_LOCK.acquire(blocking=False):
+        return  # a refresh is already in flight
+    
+    def _worker():
+        try:
+            _fetch_user_emails()
+        finally:
+            _USER_EMAILS_REFRESH_LOCK.release()
+    
+    threading.Thread(target=_worker, name="user-emails-refresh", daemon=True).start()
+
+
+def get_user_emails() -> List[str]:
+    """
+    Get normal signal recipient emails from /access/paid-emails API.
+    These users only receive clean signal emails for executed trades (OPEN signals).
+    Returns empty list if API is unavailable.
+    
+    Once populated, an expired cache is returned as-is while a background
+    thread refreshes it (stale-while-revalidate); only the first call blocks.
+    """
+    if _USER_EMAILS_CACHE is not None and _USER_EMAILS_CACHE_TIMESTAMP is not None:
+        age = time.time() - _USER_EMAILS_CACHE_TIMESTAMP
+        if age >= _CACHE_TTL_SECONDS:
+            _refresh_user_emails_in_background()
+        return _USER_EMAILS_CACHE
+    
+    return _fetch_user_emails()
+
+
+def _signal_recipients(user_emails: List[str]) -> List[str]:
+    """Drop admin emails from user_emails, reusing the last result while neither input changed."""
+    global _SIGNAL_RECIPIENTS_CACHE
+    fingerprint = _admin_env_fingerprint()
+    cached = _SIGNAL_RECIPIENTS_CACHE
+    # A refresh swaps in a new list object, so identity tells us the user cache changed
+    if cached is not None and cached[0] is user_emails and cached[1] == fingerprint:
+        return cached[2]
+    
+    admin_set = _parse_admin_emails(*fingerprint)[1]
+    recipients = [e for e in user_emails if e not in admin_set]
+    _SIGNAL_RECIPIENTS_CACHE = (user_emails, fingerprint, recipients)
+    return recipients
+
+
+def get_signal_recipients() -> List[str]:
+    """
+    User emails that should receive trade signals: get_user_emails() minus admin emails
+    (admins get admin emails, not user signals).
+    """
+    return _signal_recipients(get_user_emails())
+
+
 def _format_price(val: Optional[float]) -> str:
     """Format price to 5 decimals."""
     if val is None:
@@ -117,6 +211,11 @@ def _format_price(val: Optional[float]) -> str:
         return str(val)
 
 
+def _format_block(data: Dict[str, Any]) -> str:
+    """Render a details dict as one indented JSON block (single encoder call)."""
+    return json.dumps(data, indent=2, default=str)
+
+
 def format_user_trade_signal(
     pair: str,
     direction: str,
@@ -254,23 +353,13 @@ def format_admin_trade_notification(
     if trade_details:
         body_lines.append("")
         body_lines.append("Full Trade Details:")
-        for key, value in trade_details.items():
-            if isinstance(value, (dict, list)):
-                import json
-                body_lines.append(f"  {key}: {json.dumps(value, indent=2)}")
-            else:
-                body_lines.append(f"  {key}: {value}")
+        body_lines.append(_format_block(trade_details))
     
     # Additional context
     if additional_context:
         body_lines.append("")
         body_lines.append("Additional Context:")
-        for key, value in additional_context.items():
-            if isinstance(value, (dict, list)):
-                import json
-                body_lines.append(f"  {key}: {json.dumps(value, indent=2)}")
-            else:
-                body_lines.append(f"  {key}: {value}")
+        body_lines.append(_format_block(additional_context))
     
     body = "\n".join(body_lines)
     return subject, body
@@ -306,15 +395,7 @@ def send_admin_trade_notification(
         **kwargs
     )
     
-    sent = 0
-    for email in admin_emails:
-        try:
-            send_email(subject, body, to=email)
-            sent += 1
-        except Exception as e:
-            print(f"[EMAIL] ⚠️ Failed to send admin notification to {email}: {e}")
-    
-    return sent
+    return _dispatch(subject, body, admin_emails, "admin notification")
 
 
 def send_user_trade_signal(
@@ -348,9 +429,7 @@ def send_user_trade_signal(
         return 0
     
     # Filter out admin emails from user list (admins get admin emails, not user signals)
-    admin_emails = get_admin_emails()
-    admin_set = set(admin_emails)
-    user_emails_filtered = [e for e in user_emails if e not in admin_set]
+    user_emails_filtered = _signal_recipients(user_emails)
     
     if not user_emails_filtered:
         print("[EMAIL] ℹ️ No non-admin user emails; skipping user signal")
@@ -365,15 +444,7 @@ def send_user_trade_signal(
         rationale=rationale,
     )
     
-    sent = 0
-    import time
-    for email in user_emails_filtered:
-        try:
-            send_email(subject, body, to=email)
-            sent += 1
-            time.sleep(0.05)  # Small delay to avoid rate limits
-        except Exception as e:
-            print(f"[EMAIL] ⚠️ Failed to send user signal to {email}: {e}")
+    sent = _dispatch(subject, body, user_emails_filtered, "user signal")
     
     if signal_id:
         print(f"[EMAIL] ✅ Sent {sent} user signal emails for {signal_id}")
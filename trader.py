@@ -1,36 +1,125 @@
 import os
 import re
 import json
+import logging
+import atexit
+import reprlib
 import oandapyV20
 import oandapyV20.endpoints.orders as orders
 import oandapyV20.endpoints.pricing as pricing
-import oandapyV20.endpoints.instruments as instruments
 import oandapyV20.endpoints.accounts as account
 from oandapyV20.endpoints.accounts import AccountInstruments
-import datetime
+import threading
 import time
-from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Tuple, Optional
 
+try:
+    import numpy as np
+except ImportError:  # optional; indicator math falls back to pure Python
+    np = None
+
 from trade_cache import add_trade, get_active_trades
 from trading_config import get_config
 from validators import (
-    get_oanda_data,
+    get_oanda_hlc,
+    get_m15_atr,
+    candle_version,
+    _calculate_true_ranges_from_hlc,
+    _true_range_array,
     calculate_ema,
     get_support_resistance_levels,
     get_h4_trend_adx_atr_percent,
     passes_h4_hard_filters,
 )
+from indicator_kernels import HAVE_NUMBA, atr_ema_last, ema_last
 from news_filter import is_news_blackout
 from db_persistence import save_trade_from_oanda_account
-from datetime import datetime
+from oanda_helpers import get_shared_client
+
+try:
+    from autopip_client import AutopipClient
+    _AUTOPIP_IMPORT_ERROR = None
+except ImportError as e:  # optional; place_trade falls back to direct DB persistence
+    AutopipClient = None
+    _AUTOPIP_IMPORT_ERROR = e
+
+_UTC = timezone.utc  # tzinfo for persisted trade timestamps
+
+@dataclass(frozen=True, slots=True)
+class _EnvSettings:
+    """Environment overrides read by validate_trade_entry/place_trade, parsed once"""
+    enforce_session_hours: bool
+    allow_trend_relax: bool
+    use_allocation_percent: bool
+    allocation_percent: float
+    risk_percent: float
+    use_fixed_sl_percent: bool
+    min_rr_ratio: float
+    fixed_sl_percent: float
+    fixed_tp_percent: Optional[float]
+    atr_sl_multiplier: float
+    atr_tp_multiplier: float
+    sl_threshold: float
+    tp_threshold: float
+    use_swing_sl: bool
+    commission_per_million: float
+    price_sample_stagger_s: float
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+def _load_env_settings() -> _EnvSettings:
+    fixed_tp_percent = os.getenv("FIXED_TP_PERCENT")
+    try:
+        commission_per_million = float(os.getenv("COMMISSION_PER_MILLION", "0.0"))
+    except Exception:
+        commission_per_million = 0.0
+    return _EnvSettings(
+        enforce_session_hours=_env_flag("ENFORCE_SESSION_HOURS", "true"),
+        allow_trend_relax=_env_flag("ALLOW_TREND_RELAX", "true"),
+        use_allocation_percent=_env_flag("USE_ALLOCATION_PERCENT", "false"),
+        allocation_percent=float(os.getenv("ALLOCATION_PERCENT", "10.0")),  # default 10% if enabled
+        risk_percent=float(os.getenv("RISK_PERCENT", "1.0")),
+        use_fixed_sl_percent=_env_flag("USE_FIXED_SL_PERCENT", "false"),
+        min_rr_ratio=float(os.getenv("MIN_RR_RATIO", "1.6")),
+        fixed_sl_percent=float(os.getenv("FIXED_SL_PERCENT", "2.0")),  # e.g., 2% stop
+        fixed_tp_percent=float(fixed_tp_percent) if fixed_tp_percent else None,
+        atr_sl_multiplier=float(os.getenv("ATR_SL_MULTIPLIER", "2.0")),  # Increased for better win rate
+        atr_tp_multiplier=float(os.getenv("ATR_TP_MULTIPLIER", "2.8")),  # tuned default 2.5–3.2
+        sl_threshold=float(os.getenv("SL_THRESHOLD", "0.004")),  # 0.4%
+        tp_threshold=float(os.getenv("TP_THRESHOLD", "0.008")),  # 0.8% (2:1 ratio)
+        use_swing_sl=_env_flag("USE_SWING_SL", "true"),
+        commission_per_million=commission_per_million,
+        price_sample_stagger_s=max(float(os.getenv("PRICE_SAMPLE_STAGGER_S", "0.2")), 0.0),  # 0 = both quotes at once
+    )
+
+_ENV = _load_env_settings()
+
+def reload_env_settings() -> _EnvSettings:
+    """Re-read the trade-path environment overrides (useful for runtime updates)"""
+    global _ENV
+    _ENV = _load_env_settings()
+    return _ENV
+
+logger = logging.getLogger(__name__)
 
 # --- Correlation groups (prevent stacking highly correlated exposure) ---
 CORRELATION_GROUPS = [
     {"name": "USD_MAJORS", "members": ["EURUSD", "GBPUSD", "AUDUSD", "NZDUSD", "USDCAD", "USDCHF"]},
     {"name": "YEN_CROSSES", "members": ["USDJPY", "EURJPY", "GBPJPY", "AUDJPY", "NZDJPY"]},
 ]
+# symbol -> member sets of every correlation group containing it, built once at import
+_SYM_TO_GROUPS = {}
+for _group in CORRELATION_GROUPS:
+    _members = frozenset(_group["members"])
+    for _member in _members:
+        _SYM_TO_GROUPS[_member] = _SYM_TO_GROUPS.get(_member, ()) + (_members,)
 
+@lru_cache(maxsize=256)
 def _normalize_symbol(symbol: str) -> str:
     return symbol.upper().replace("_", "")
 
@@ -43,61 +132,77 @@ def _safe_fmt(value, fmt: str = ".2f", default: str = "N/A"):
         return f"{value:{fmt}}"
     return str(value)
 
-def _is_correlated_with_open(symbol: str, user_id=None, allow_low_risk_increment: bool = True) -> bool:
+def _is_correlated_with_open(symbol: str, user_id=None, allow_low_risk_increment: bool = True, active_trades=None) -> bool:
     """Return True if symbol belongs to a correlation group with any active trade symbol.
     If user_id is provided, only checks trades for that user's account.
     If allow_low_risk_increment is True, allows new trades when incremental risk is low.
+    active_trades: the caller's get_active_trades() result, to avoid reading the cache again.
     """
     try:
-        active = get_active_trades()
+        groups = _SYM_TO_GROUPS.get(_normalize_symbol(symbol))
+        if not groups:
+            return False  # not in any correlation group; no need to load trades
+        active = active_trades if active_trades is not None else get_active_trades()
+        if not active:
+            return False
         # TODO: Filter active trades by user_id if provided (requires trade_cache enhancement)
         # For now, we check all active trades but this should be per-user in the future
-        active_syms = {_normalize_symbol(t.get("symbol", t.get("instrument", ""))) for t in active}
-        sym = _normalize_symbol(symbol)
+        # add_trade stores symbol_norm; older cached trades are normalised here
+        active_syms = {t.get("symbol_norm") or _normalize_symbol(t.get("symbol", t.get("instrument", ""))) for t in active}
         
-        for group in CORRELATION_GROUPS:
-            members = set(group["members"])
-            if sym in members:
-                correlated_count = sum(1 for a in active_syms if a in members)
-                
-                # If no correlated trades, allow
-                if correlated_count == 0:
-                    continue
-                
-                # If allow_low_risk_increment is enabled, allow up to 2 correlated trades
-                # This provides diversification while controlling stacking
-                if allow_low_risk_increment and correlated_count < 2:
-                    print(f"[VALIDATION] ⚠️ Correlation warning: {correlated_count} correlated trade(s), but allowing (low incremental risk)")
-                    continue
-                
-                # Block if too many correlated trades
-                return True
+        for members in groups:
+            correlated_count = len(active_syms & members)
+            
+            # If no correlated trades, allow
+            if correlated_count == 0:
+                continue
+            
+            # If allow_low_risk_increment is enabled, allow up to 2 correlated trades
+            # This provides diversification while controlling stacking
+            if allow_low_risk_increment and correlated_count < 2:
+                print(f"[VALIDATION] ⚠️ Correlation warning: {correlated_count} correlated trade(s), but allowing (low incremental risk)")
+                continue
+            
+            # Block if too many correlated trades
+            return True
         
         return False
     except Exception:
         return False
 
+# (symbol, lookback) -> (H4 candle version, (low, high)); see validators.candle_version
+_SWING_CACHE = {}
+
 def _find_recent_swing_levels(symbol: str, side: str, lookback: int = 30) -> tuple:
-    """Find recent swing high/low on H4 within lookback candles for swing-based SL."""
+    """Find recent swing high/low on H4 within lookback candles for swing-based SL.
+    Levels are the trailing extremes of the last `lookback` bars (one array reduction each);
+    no bar after the current one is consulted, so there is no pivot-confirmation lookahead."""
     try:
-        candles = get_oanda_data(symbol.replace("_", ""), "H4", max(lookback, 20))
-        if not candles:
+        version = candle_version(symbol, "H4")
+        cached = _SWING_CACHE.get((symbol, lookback))
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        hlc = get_oanda_hlc(symbol, "H4", max(lookback, 20))
+        if hlc is None:
             return None, None
-        highs = [float(c["mid"]["h"]) for c in candles]
-        lows = [float(c["mid"]["l"]) for c in candles]
-        recent_high = max(highs[-lookback:]) if len(highs) >= lookback else max(highs)
-        recent_low = min(lows[-lookback:]) if len(lows) >= lookback else min(lows)
-        return recent_low, recent_high
+        highs, lows = hlc[0][-lookback:], hlc[1][-lookback:]
+        if np is not None:
+            levels = float(lows.min()), float(highs.max())
+        else:
+            levels = float(min(lows)), float(max(highs))
+        if version is not None:
+            _SWING_CACHE[(symbol, lookback)] = (version, levels)
+        return levels
     except Exception:
         return None, None
 
 def _ma_trend_direction(symbol: str, oanda_client=None) -> str:
     """Return 'bullish' or 'bearish' via EMA50 vs EMA200 on H4."""
     try:
-        candles = get_oanda_data(symbol.replace("_", ""), "H4", 210, oanda_client=oanda_client)
-        if not candles or len(candles) < 200:
+        hlc = get_oanda_hlc(symbol, "H4", 210, oanda_client=oanda_client)
+        if hlc is None or len(hlc[2]) < 200:
             return "unknown"
-        closes = [float(c["mid"]["c"]) for c in candles]
+        closes = hlc[2]
         ema50 = calculate_ema(closes[-50:], 50)
         ema200 = calculate_ema(closes, 200)
         if ema50 is None or ema200 is None:
@@ -106,40 +211,43 @@ def _ma_trend_direction(symbol: str, oanda_client=None) -> str:
     except Exception:
         return "unknown"
 
+# (instrument, periods) -> (H4 candle version, atr); recomputed whenever the forming candle moves
+_ATR_CACHE = {}
+
 def calculate_atr(client, account_id, instrument, periods=21):
     """Calculate Average True Range optimized for 4H trading"""
     try:
+        version = candle_version(instrument, "H4", oanda_client=client)
+        cached = _ATR_CACHE.get((instrument, periods))
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        
         # For 4H trading, use 21 periods (about 3.5 days of data)
         # This gives a good balance of responsiveness and stability
-        params = {
-            "count": periods + 1,
-            "granularity": "H4"  # 4-hour candles
-        }
-        r = instruments.InstrumentsCandles(instrument=instrument, params=params)
-        client.request(r)
-        candles = r.response["candles"]
+        # (fetched through get_oanda_hlc so it shares the H4 candle cache)
+        highs, lows, closes = get_oanda_hlc(instrument, "H4", periods + 1, oanda_client=client) or ([], [], [])
         
-        if len(candles) < periods + 1:
-            print(f"[ATR] Insufficient data for ATR calculation: {len(candles)} candles")
+        if len(closes) < periods + 1:
+            print(f"[ATR] Insufficient data for ATR calculation: {len(closes)} candles")
             return None
         
-        true_ranges = []
-        for i in range(1, len(candles)):
-            current = candles[i]
-            previous = candles[i-1]
-            
-            high = float(current["mid"]["h"])
-            low = float(current["mid"]["l"])
-            prev_close = float(previous["mid"]["c"])
-            
-            tr1 = high - low
-            tr2 = abs(high - prev_close)
-            tr3 = abs(low - prev_close)
-            
-            true_ranges.append(max(tr1, tr2, tr3))
+        if HAVE_NUMBA:
+            # Fused true-range + EMA kernel; no intermediate true-range array
+            atr = atr_ema_last(highs, lows, closes, periods)
+            if version is not None:
+                _ATR_CACHE[(instrument, periods)] = (version, atr)
+            print(f"[ATR] 4H ATR calculated: {atr:.5f} over {len(closes) - 1} periods")
+            return atr
+        if np is not None:
+            # One vectorised true-range pass over the parsed columns
+            true_ranges = _true_range_array(highs, lows, closes)
+        else:
+            true_ranges = _calculate_true_ranges_from_hlc(highs, lows, closes)
         
         # Use Exponential Moving Average for ATR (more responsive for 4H)
         atr = calculate_ema_atr(true_ranges, periods)
+        if version is not None:
+            _ATR_CACHE[(instrument, periods)] = (version, atr)
         
         print(f"[ATR] 4H ATR calculated: {atr:.5f} over {len(true_ranges)} periods")
         return atr
@@ -148,20 +256,58 @@ def calculate_atr(client, account_id, instrument, periods=21):
         return None
 
 def calculate_ema_atr(true_ranges, periods):
-    """Calculate EMA-based ATR for more responsive 4H calculations"""
-    if not true_ranges:
+    """Calculate EMA-based ATR for more responsive 4H calculations (list or NumPy array)"""
+    if len(true_ranges) == 0:
         return None
+    if np is not None:
+        return ema_last(true_ranges, periods)  # compiled recurrence, or its NumPy closed form
     
     multiplier = 2.0 / (periods + 1)
-    ema_atr = true_ranges[0]  # Start with first value
+    ema_atr = float(true_ranges[0])  # Start with first value
     
     for tr in true_ranges[1:]:
         ema_atr = (tr * multiplier) + (ema_atr * (1 - multiplier))
     
-    return ema_atr
+    return float(ema_atr)
 
-def get_market_spread(client, account_id, instrument):
-    """Get current market spread to assess liquidity"""
+# Spreads batch-fetched by prefetch_market_spreads for the current tick:
+# (account_id, instrument) -> (monotonic fetch time, (spread, bid, ask))
+SPREAD_SNAPSHOT_TTL_S = 5.0
+_SPREAD_SNAPSHOT = {}
+
+def get_market_spreads(client, account_id, instruments_list):
+    """Get spreads for several instruments with one PricingInfo request.
+    Returns {instrument: (spread, bid, ask)}; instruments missing from the response are omitted."""
+    if not instruments_list:
+        return {}
+    try:
+        r = pricing.PricingInfo(accountID=account_id, params={"instruments": ",".join(instruments_list)})
+        client.request(r)
+        spreads = {}
+        for prices in r.response.get("prices", []):
+            bid = float(prices["bids"][0]["price"])
+            ask = float(prices["asks"][0]["price"])
+            spreads[prices["instrument"]] = (ask - bid, bid, ask)
+        return spreads
+    except Exception as e:
+        print(f"[SPREAD] Error getting spreads: {e}")
+        return {}
+
+def prefetch_market_spreads(client, account_id, instruments_list):
+    """Batch-fetch spreads once per tick so get_market_spread can answer from memory."""
+    spreads = get_market_spreads(client, account_id, list(dict.fromkeys(instruments_list)))
+    fetched_at = time.monotonic()
+    for instrument, quote in spreads.items():
+        _SPREAD_SNAPSHOT[(account_id, instrument)] = (fetched_at, quote)
+    return spreads
+
+def get_market_spread(client, account_id, instrument, fresh=False):
+    """Get current market spread to assess liquidity.
+    Uses a prefetch_market_spreads snapshot younger than SPREAD_SNAPSHOT_TTL_S unless fresh=True."""
+    if not fresh:
+        cached = _SPREAD_SNAPSHOT.get((account_id, instrument))
+        if cached is not None and time.monotonic() - cached[0] < SPREAD_SNAPSHOT_TTL_S:
+            return cached[1]
     try:
         r = pricing.PricingInfo(accountID=account_id, params={"instruments": instrument})
         client.request(r)
@@ -174,18 +320,199 @@ def get_market_spread(client, account_id, instrument):
         print(f"[SPREAD] Error getting spread: {e}")
         return None, None, None
 
+# Entry price sampling: two PricingInfo requests in flight together, the second started
+# _ENV.price_sample_stagger_s after the first (replaces a blocking sleep between them)
+_PRICE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="price")
+# Account details, H4 ATR and M15 ATR for place_trade, fetched alongside the price samples
+_PRETRADE_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="pretrade")
+
+def _sample_entry_prices(client, account_id, instrument, side):
+    """Return (first, second) price samples taken _ENV.price_sample_stagger_s apart"""
+    first = _PRICE_POOL.submit(get_current_price, client, account_id, instrument, side)
+    if _ENV.price_sample_stagger_s:
+        time.sleep(_ENV.price_sample_stagger_s)
+    second = _PRICE_POOL.submit(get_current_price, client, account_id, instrument, side)
+    return first.result(), second.result()
+
+# Created on first API sync, not at import: its env (AUTOPIP_API_BASE_URL, BOT_API_KEY)
+# may be loaded from .env after this module is imported
+_AUTOPIP = None
+
+def _autopip_client():
+    global _AUTOPIP
+    if _AUTOPIP is None:
+        _AUTOPIP = AutopipClient()
+    return _AUTOPIP
+
+def _db_trade_kwargs(trade_record, **extra):
+    """save_trade_from_oanda_account kwargs for a place_trade trade_record (API field names)"""
+    return {
+        "external_id": trade_record["externalTradeId"],
+        "instrument": trade_record["symbol"],
+        "side": trade_record["side"].lower(),
+        "units": trade_record["size"],
+        "entry_price": trade_record["entry"],
+        **extra,
+    }
+
+# Trade persistence runs off the order path: the first attempt starts on a daemon timer as soon
+# as place_trade has the fill, and if both paths fail it is retried after each of
+# PERSIST_RETRY_DELAYS_S. At exit (atexit, and SIGTERM once an entrypoint has passed it to
+# trade_cache.install_sigterm_flush) flush_pending_persists runs every write not yet started
+# and waits up to PERSIST_FLUSH_TIMEOUT_S for those already in flight
+PERSIST_RETRY_DELAYS_S = (2.0, 8.0)
+PERSIST_FLUSH_TIMEOUT_S = 15.0
+# trade_id -> (Timer, trade_record, attempt, persist kwargs) for attempts not yet started
+_PERSIST_RETRIES = {}
+# trade_id -> Thread for attempts currently running
+_PERSIST_RUNNING = {}
+_PERSIST_RETRIES_LOCK = threading.Lock()
+
+def _persist_trade_once(trade_record, *, user_id, account_id, opened_at, timeframe, attempt, **db_costs) -> bool:
+    """One pass over both persistence paths; True once either succeeds"""
+    trade_id = trade_record["externalTradeId"]
+    attempts = len(PERSIST_RETRY_DELAYS_S) + 1
+    persistence_error = None
+    if user_id is not None:
+        # Enhanced mode: Try API sync first
+        try:
+            if AutopipClient is None:
+                raise _AUTOPIP_IMPORT_ERROR
+            _autopip_client().post_trade({
+                **trade_record,
+                "userId": user_id,
+                "status": "OPEN",
+                "pnl": None,
+                "openedAt": opened_at.isoformat(),
+                "closedAt": None,
+                "timeframe": timeframe,
+                "oandaAccountId": account_id,
+            })
+            logger.info("[DB] ✅ Trade %s saved to database via API sync for user %s", trade_id, user_id)
+            return True
+        except ImportError as e:
+            # AutopipClient not available - fall through to direct DB
+            persistence_error = f"API client import failed: {e}"
+            logger.warning("[DB] ⚠️ API sync unavailable (%s) - falling back to direct DB persistence", persistence_error)
+        except Exception as api_error:
+            # API sync failed - fall through to direct DB
+            persistence_error = f"API sync failed: {api_error}"
+            logger.warning("[DB] ⚠️ API trade sync failed for trade %s, user %s, account %s: %s - falling back to direct DB persistence",
+                           trade_id, user_id, account_id, persistence_error)
+
+    # Fallback to direct DB persistence if API sync failed or user_id not provided
+    try:
+        save_trade_from_oanda_account(**_db_trade_kwargs(
+            trade_record, oanda_account_id=account_id, opened_at=opened_at, **db_costs,
+        ))
+        logger.info("[DB] ✅ Trade %s saved to database %s", trade_id,
+                    "via fallback (API sync had failed)" if persistence_error else "(legacy mode)")
+        return True
+    except Exception as db_error:
+        persistence_error = f"Direct DB persistence failed: {db_error}"
+        logger.exception("[DB] ❌ All persistence paths failed for trade %s (attempt %d/%d): %s",
+                         trade_id, attempt, attempts, persistence_error)
+    return False
+
+def _persist_trade(trade_record, **persist_kwargs):
+    """Persist one opened trade in the background: API sync first (if user_id), else/then direct
+    DB write, retried after PERSIST_RETRY_DELAYS_S while both fail."""
+    _schedule_persist_retry(trade_record, 1, persist_kwargs)
+
+def _log_persistence_failure(trade_record, account_id):
+    # This is a critical failure - trade exists on OANDA but not persisted
+    logger.error("[DB] 🚨 PERSISTENCE FAILURE: Trade %s on OANDA account %s was NOT saved to database; "
+                 "it will not appear in the dashboard until reconciliation runs",
+                 trade_record["externalTradeId"], account_id)
+
+def _schedule_persist_retry(trade_record, attempt, persist_kwargs):
+    if attempt > len(PERSIST_RETRY_DELAYS_S) + 1:
+        _log_persistence_failure(trade_record, persist_kwargs["account_id"])
+        return
+    trade_id = trade_record["externalTradeId"]
+    delay = PERSIST_RETRY_DELAYS_S[attempt - 2] if attempt > 1 else 0.0
+    timer = threading.Timer(delay, _run_persist_retry, args=(trade_id,))
+    timer.daemon = True
+    with _PERSIST_RETRIES_LOCK:
+        _PERSIST_RETRIES[trade_id] = (timer, trade_record, attempt, persist_kwargs)
+    timer.start()
+
+def _run_persist_retry(trade_id):
+    with _PERSIST_RETRIES_LOCK:
+        entry = _PERSIST_RETRIES.pop(trade_id, None)
+        if entry is None:
+            return  # already taken by flush_pending_persists
+        _PERSIST_RUNNING[trade_id] = threading.current_thread()
+    _, trade_record, attempt, persist_kwargs = entry
+    try:
+        if not _persist_trade_once(trade_record, attempt=attempt, **persist_kwargs):
+            _schedule_persist_retry(trade_record, attempt + 1, persist_kwargs)
+    finally:
+        with _PERSIST_RETRIES_LOCK:
+            _PERSIST_RUNNING.pop(trade_id, None)
+
+def flush_pending_persists(timeout=PERSIST_FLUSH_TIMEOUT_S):
+    """Run every persistence attempt not yet started immediately and wait up to `timeout`
+    seconds for those already running (process shutdown)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        with _PERSIST_RETRIES_LOCK:
+            entries = list(_PERSIST_RETRIES.values())
+            _PERSIST_RETRIES.clear()
+            running = list(_PERSIST_RUNNING.values())
+        if not entries and not running:
+            return
+        for timer, trade_record, attempt, persist_kwargs in entries:
+            timer.cancel()
+            if not _persist_trade_once(trade_record, attempt=attempt, **persist_kwargs):
+                _log_persistence_failure(trade_record, persist_kwargs["account_id"])
+        for thread in running:
+            # A failing in-flight attempt reschedules itself; the next pass runs that now
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if time.monotonic() >= deadline:
+            with _PERSIST_RETRIES_LOCK:
+                left = len(_PERSIST_RETRIES) + len(_PERSIST_RUNNING)
+            if left:
+                logger.error("[DB] 🚨 %d trade persistence attempt(s) unfinished at shutdown", left)
+            return
+
+atexit.register(flush_pending_persists)
+
+# Balance barely moves between trades in a burst: account_id -> (monotonic fetch time, balance, currency).
+# Per-account locks make concurrent trades on one account share a single AccountDetails request
+ACCOUNT_SNAPSHOT_TTL_S = 30.0
+_ACCOUNT_SNAPSHOT = {}
+_ACCOUNT_SNAPSHOT_LOCKS = {}
+
+def _account_balance(client, account_id, ttl=ACCOUNT_SNAPSHOT_TTL_S):
+    """(balance, currency) from AccountDetails, reused for up to ttl seconds per account"""
+    with _ACCOUNT_SNAPSHOT_LOCKS.setdefault(account_id, threading.Lock()):
+        cached = _ACCOUNT_SNAPSHOT.get(account_id)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1], cached[2]
+        r_balance = account.AccountDetails(account_id)
+        client.request(r_balance)
+        details = r_balance.response['account']
+        balance, currency = float(details['balance']), details.get('currency', 'USD')
+        _ACCOUNT_SNAPSHOT[account_id] = (time.monotonic(), balance, currency)
+        return balance, currency
+
+def atr_stop_distances(atr, m15_atr, sl_multiplier, tp_multiplier, min_rr_ratio):
+    """(sl_distance, tp_distance) in price units for ATR-based stops.
+    SL is the larger of sl_multiplier x H4 ATR and 2.5x M15 ATR (execution noise buffer; a
+    missing M15 ATR never wins); TP is tp_multiplier x ATR, widened to max(1.8, min_rr_ratio) x SL."""
+    sl_distance = max(atr * sl_multiplier, (m15_atr or 0.0) * 2.5)
+    tp_distance = max(atr * tp_multiplier, sl_distance * max(1.8, min_rr_ratio))
+    return sl_distance, tp_distance
+
 def calculate_dynamic_position_size(balance, risk_percent, atr, instrument):
     """Calculate position size based on account balance, risk percentage, and volatility"""
     # Risk per trade as percentage of account balance
     risk_amount = balance * (risk_percent / 100)
     
-    # Adjust for instrument type
-    if "JPY" in instrument:
-        pip_value = 0.01  # For JPY pairs, 1 pip = 0.01
-        atr_pips = atr * 100
-    else:
-        pip_value = 0.0001  # For most pairs, 1 pip = 0.0001
-        atr_pips = atr * 10000
+    # Adjust for instrument type (JPY 0.01, metals 0.1/0.01, else 0.0001)
+    pip_value = _pip_value(instrument)
+    atr_pips = atr / pip_value
     
     # Calculate position size based on ATR (using 2x ATR as stop loss distance)
     stop_distance_pips = atr_pips * 2
@@ -200,30 +527,45 @@ def calculate_dynamic_position_size(balance, risk_percent, atr, instrument):
     
     return position_size
 
+# UTC hours favourable for 4H momentum, per session
+_ASIAN_HOURS = frozenset(h for h in range(24) if h >= 22 or h <= 10)  # Asian + Asian-European overlap: 22:00-10:00
+_EUROPEAN_HOURS = frozenset(range(6, 19))  # Euro open through NY overlap: 06:00-18:00
+_AMERICAN_HOURS = frozenset(range(12, 23))  # Peak USD volatility: 12:00-22:00
+_OVERLAP_HOURS = frozenset(range(12, 18))  # European-American overlap: 12:00-17:00
+
+@lru_cache(maxsize=64)
+def _favorable_hours(instrument: str) -> frozenset:
+    """Session hours for an instrument; classified once per instrument"""
+    if "JPY" in instrument:
+        return _ASIAN_HOURS
+    if any(ccy in instrument for ccy in ("EUR", "GBP", "CHF")):
+        return _EUROPEAN_HOURS
+    if any(ccy in instrument for ccy in ("USD", "CAD")):
+        return _AMERICAN_HOURS
+    # General major session overlaps (best for 4H momentum)
+    return _OVERLAP_HOURS
+
+# (hour, weekday) in UTC, valid until the epoch second the next UTC hour starts
+_UTC_CLOCK = {"expires": 0.0, "hour": 0, "weekday": 0}
+
+def _utc_hour_weekday() -> Tuple[int, int]:
+    """Current UTC (hour, weekday); both only change on hour boundaries, so recompute once per hour"""
+    now_ts = time.time()
+    if now_ts >= _UTC_CLOCK["expires"]:
+        now = time.gmtime(now_ts)  # tm_wday is Monday=0, like datetime.weekday()
+        _UTC_CLOCK.update(
+            expires=now_ts - (now_ts % 3600) + 3600,
+            hour=now.tm_hour,
+            weekday=now.tm_wday,
+        )
+    return _UTC_CLOCK["hour"], _UTC_CLOCK["weekday"]
+
 def is_market_hours_favorable(instrument):
     """Check if current time is favorable for 4H trading"""
-    now = datetime.datetime.utcnow()
-    hour = now.hour
-    
+    hour, _ = _utc_hour_weekday()
     # For 4H trading, we need sustained momentum periods
     # Focus on major session overlaps and high-volume periods
-    
-    if "JPY" in instrument:
-        # Asian session + Asian-European overlap: 22:00-10:00 UTC
-        # Peak Asian liquidity for 4H moves
-        return hour >= 22 or hour <= 10
-    elif any(pair in instrument for pair in ["EUR", "GBP", "CHF"]):
-        # European session + overlaps: 06:00-18:00 UTC
-        # Covers Euro open through NY overlap
-        return 6 <= hour <= 18
-    elif any(pair in instrument for pair in ["USD", "CAD"]):
-        # American session focus: 12:00-22:00 UTC
-        # Peak USD volatility for 4H moves
-        return 12 <= hour <= 22
-    else:
-        # General major session overlaps (best for 4H momentum)
-        # European-American overlap: 12:00-17:00 UTC
-        return 12 <= hour <= 17
+    return hour in _favorable_hours(instrument)
 
 def _check_volatility_spike(instrument: str, oanda_client=None) -> Tuple[bool, Optional[float]]:
     """
@@ -231,47 +573,46 @@ def _check_volatility_spike(instrument: str, oanda_client=None) -> Tuple[bool, O
     Returns (is_spike, current_atr_pct) where is_spike=True if ATR% > 1.5x recent average.
     """
     try:
-        from validators import get_h4_trend_adx_atr_percent, get_oanda_data
-        from validators import calculate_ema
-        
         # Get current ATR%
-        trend, adx, current_atr_pct = get_h4_trend_adx_atr_percent(instrument.replace("_", ""), oanda_client=oanda_client)
+        trend, adx, current_atr_pct = get_h4_trend_adx_atr_percent(instrument, oanda_client=oanda_client)
         if current_atr_pct is None:
             return False, None
         
         # Get historical ATR% values (last 20 H4 candles = ~3.3 days)
-        candles = get_oanda_data(instrument.replace("_", ""), "H4", 60, oanda_client=oanda_client)
-        if not candles or len(candles) < 20:
+        highs, lows, closes = get_oanda_hlc(instrument, "H4", 60, oanda_client=oanda_client) or ([], [], [])
+        n = len(closes)
+        if n < 20:
             return False, current_atr_pct
         
         # Calculate ATR% for each period
-        atr_pcts = []
-        for i in range(20, len(candles)):
-            period_candles = candles[i-20:i]
-            closes = [float(c["mid"]["c"]) for c in period_candles]
-            highs = [float(c["mid"]["h"]) for c in period_candles]
-            lows = [float(c["mid"]["l"]) for c in period_candles]
-            
-            # Calculate ATR for this period
-            tr_list = []
-            for j in range(1, len(period_candles)):
-                tr1 = highs[j] - lows[j]
-                tr2 = abs(highs[j] - closes[j-1])
-                tr3 = abs(lows[j] - closes[j-1])
-                tr_list.append(max(tr1, tr2, tr3))
-            
-            if tr_list:
-                # Simple ATR (average of TR)
-                atr = sum(tr_list) / len(tr_list)
-                atr_pct = (atr / closes[-1] * 100.0) if closes[-1] > 0 else None
-                if atr_pct:
-                    atr_pcts.append(atr_pct)
+        if np is not None:
+            # Rolling 20-candle windows from one true-range pass and a cumulative sum:
+            # window i covers candles[i-20:i], i.e. the 19 TRs ending at candle i-1
+            csum = np.concatenate(([0.0], np.cumsum(_true_range_array(highs, lows, closes))))
+            rolling_atr = (csum[19:n - 1] - csum[:n - 20]) / 19.0
+            window_close = closes[19:n - 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pcts = rolling_atr / window_close * 100.0
+            atr_pcts = pcts[(window_close > 0) & (pcts != 0)]
+        else:
+            atr_pcts = []
+            for i in range(20, n):
+                # Calculate ATR for this period
+                tr_list = _calculate_true_ranges_from_hlc(highs[i-20:i], lows[i-20:i], closes[i-20:i])
+                
+                if tr_list:
+                    # Simple ATR (average of TR)
+                    atr = sum(tr_list) / len(tr_list)
+                    window_close = closes[i-1]
+                    atr_pct = (atr / window_close * 100.0) if window_close > 0 else None
+                    if atr_pct:
+                        atr_pcts.append(atr_pct)
         
-        if not atr_pcts:
+        if len(atr_pcts) == 0:
             return False, current_atr_pct
         
         # Calculate average ATR%
-        avg_atr_pct = sum(atr_pcts) / len(atr_pcts)
+        avg_atr_pct = float(sum(atr_pcts) / len(atr_pcts))
         
         # Check if current ATR% is > 1.5x average (spike threshold)
         spike_threshold = avg_atr_pct * 1.5
@@ -291,9 +632,7 @@ def _is_weekend_risk_period() -> bool:
     Check if current time is in weekend risk period (Friday 20:00 UTC - Sunday 22:00 UTC).
     Returns True if in weekend risk period.
     """
-    now = datetime.utcnow()
-    weekday = now.weekday()  # 0=Monday, 4=Friday, 6=Sunday
-    hour = now.hour
+    hour, weekday = _utc_hour_weekday()  # weekday: 0=Monday, 4=Friday, 6=Sunday
     
     # Friday after 20:00 UTC through Sunday before 22:00 UTC
     if weekday == 4 and hour >= 20:  # Friday 20:00+
@@ -306,6 +645,14 @@ def _is_weekend_risk_period() -> bool:
     return False
 
 
+# Runs the independent OANDA-backed gates of one validate_trade_entry call concurrently
+_VALIDATION_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="validate")
+# Longest wait on any one gate's fetch; a timeout rejects the entry like any other fetch error
+VALIDATION_FETCH_TIMEOUT_S = 10.0
+
+# Entry-signal words in a trade idea, matched as substrings in one pass
+_SIGNAL_RE = re.compile("breakout|bounce|rejection|confirmation|entry", re.IGNORECASE)
+
 def validate_trade_entry(client, account_id, instrument, side, trade_idea, user_id=None, skip_duplicate_validation=False):
     """Enhanced validation before placing trade.
     
@@ -319,67 +666,56 @@ def validate_trade_entry(client, account_id, instrument, side, trade_idea, user_
         skip_duplicate_validation: If True, skip validation that was already done in enhanced path.
                                    This prevents legacy validation from blocking trades after enhanced validation has passed.
     """
+    config = get_config()  # bound once for every gate below
+    
     # For live enhanced mode, if enhanced validation has already passed, skip duplicate validation
     if skip_duplicate_validation:
-        print("[VALIDATION] ℹ️ Skipping legacy trade context build — enhanced execution active (validation already passed)")
+        logger.info("[VALIDATION] ℹ️ Skipping legacy trade context build — enhanced execution active (validation already passed)")
         # Still do basic safety checks (spread, correlation, concurrent trades) but skip technical analysis
         # that was already done in enhanced validation
         try:
             # Portfolio constraints: cap concurrent trades and correlation groups
             active_trades = get_active_trades()
-            if len(active_trades) >= get_config().risk_management.max_open_trades:
-                print(f"[VALIDATION] ❌ Max open trades reached: {len(active_trades)}")
+            if len(active_trades) >= config.risk_management.max_open_trades:
+                logger.info("[VALIDATION] ❌ Max open trades reached: %s", len(active_trades))
                 return False
-            if _is_correlated_with_open(instrument, user_id=user_id, allow_low_risk_increment=True):
-                print(f"[VALIDATION] ❌ Correlation lockout: too many correlated positions (max 2 per group)")
+            if _is_correlated_with_open(instrument, user_id=user_id, allow_low_risk_increment=True,
+                                        active_trades=active_trades):
+                logger.info("[VALIDATION] ❌ Correlation lockout: too many correlated positions (max 2 per group)")
                 return False
             
             # Check spread (basic liquidity check)
             spread, bid, ask = get_market_spread(client, account_id, instrument)
             if spread:
-                max_spread = get_config().get_max_spread(instrument)
+                max_spread = config.get_max_spread(instrument)
                 if spread > max_spread:
-                    print(f"[VALIDATION] ❌ Spread too wide: {spread:.5f} > {max_spread:.5f}")
+                    logger.info("[VALIDATION] ❌ Spread too wide: %.5f > %.5f", spread, max_spread)
                     return False
-                print(f"[VALIDATION] ✅ Spread acceptable: {spread:.5f}")
+                logger.info("[VALIDATION] ✅ Spread acceptable: %.5f", spread)
             
             return True
         except Exception as e:
-            print(f"[VALIDATION] Error during basic validation: {e}")
+            logger.error("[VALIDATION] Error during basic validation: %s", e)
             return False
     
     try:
         # Config-driven favorable hours enforcement
-        config = get_config()
-        enforce_session_hours = os.getenv("ENFORCE_SESSION_HOURS", "true").lower() == "true"
+        enforce_session_hours = _ENV.enforce_session_hours
         is_favorable_time = config.is_favorable_trading_time(instrument)
         if not is_favorable_time:
             if enforce_session_hours:
-                print(f"[VALIDATION] ❌ Outside favorable session hours for {instrument}")
+                logger.info("[VALIDATION] ❌ Outside favorable session hours for %s", instrument)
                 return False
             else:
-                print(f"[VALIDATION] Warning: Trading outside favorable hours for {instrument}")
+                logger.warning("[VALIDATION] Warning: Trading outside favorable hours for %s", instrument)
 
         # Optional news blackout window
         if is_news_blackout(instrument):
-            print(f"[VALIDATION] ❌ News blackout active for {instrument}")
+            logger.info("[VALIDATION] ❌ News blackout active for %s", instrument)
             return False
         
-        # Volatility spike protection: throttle entries during abnormal ATR expansion
-        is_spike, atr_pct = _check_volatility_spike(instrument, oanda_client=client)
-        if is_spike:
-            # Allow only high-quality setups during volatility spikes (require higher score)
-            print(f"[VALIDATION] ⚠️ Volatility spike detected (ATR%={atr_pct:.2f}%), requiring exceptional setup quality")
-            # This will be checked by the enhanced validation layer (higher score threshold)
-            # For now, we just log a warning but don't block (let enhanced layer decide)
-        
-        # Weekend risk protection: reduce exposure or require higher quality
-        if _is_weekend_risk_period():
-            print(f"[VALIDATION] ⚠️ Weekend risk period detected - requiring higher quality setup")
-            # Enhanced validation layer should apply stricter criteria
-            # For now, we just log a warning but don't block (let enhanced layer decide)
-        
         # Portfolio constraints: cap concurrent trades and correlation groups
+        # (in-memory checks, so they run before any gate that hits the OANDA API)
         # If user_id is provided, filter active_trades to this user's account
         active_trades = get_active_trades()
         if user_id is not None:
@@ -388,27 +724,52 @@ def validate_trade_entry(client, account_id, instrument, side, trade_idea, user_
             # The trade_cache may need to be enhanced to track user_id per trade
             pass  # TODO: Enhance trade_cache to support per-user filtering
         
-        if len(active_trades) >= get_config().risk_management.max_open_trades:
-            print(f"[VALIDATION] ❌ Max open trades reached: {len(active_trades)}")
+        if len(active_trades) >= config.risk_management.max_open_trades:
+            logger.info("[VALIDATION] ❌ Max open trades reached: %s", len(active_trades))
             return False
-        if _is_correlated_with_open(instrument, user_id=user_id, allow_low_risk_increment=True):
-            print(f"[VALIDATION] ❌ Correlation lockout: too many correlated positions (max 2 per group)")
+        if _is_correlated_with_open(instrument, user_id=user_id, allow_low_risk_increment=True,
+                                    active_trades=active_trades):
+            logger.info("[VALIDATION] ❌ Correlation lockout: too many correlated positions (max 2 per group)")
             return False
+        
+        # Every remaining gate needs its own OANDA fetch: start them together and read the
+        # results in gate order, so an early rejection leaves the rest to finish unobserved
+        symbol = instrument.replace("_", "")
+        spike_future = _VALIDATION_POOL.submit(_check_volatility_spike, instrument, oanda_client=client)
+        spread_future = _VALIDATION_POOL.submit(get_market_spread, client, account_id, instrument)
+        trend_future = _VALIDATION_POOL.submit(_ma_trend_direction, instrument, oanda_client=client)
+        levels_future = _VALIDATION_POOL.submit(get_support_resistance_levels, symbol, 120, oanda_client=client)
+        atr_future = _VALIDATION_POOL.submit(calculate_atr, client, account_id, instrument)
+        regime_future = _VALIDATION_POOL.submit(passes_h4_hard_filters, symbol, side, oanda_client=client)
+        
+        # Volatility spike protection: throttle entries during abnormal ATR expansion
+        is_spike, atr_pct = spike_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S)
+        if is_spike:
+            # Allow only high-quality setups during volatility spikes (require higher score)
+            logger.warning("[VALIDATION] ⚠️ Volatility spike detected (ATR%%=%.2f%%), requiring exceptional setup quality", atr_pct)
+            # This will be checked by the enhanced validation layer (higher score threshold)
+            # For now, we just log a warning but don't block (let enhanced layer decide)
+        
+        # Weekend risk protection: reduce exposure or require higher quality
+        if _is_weekend_risk_period():
+            logger.warning("[VALIDATION] ⚠️ Weekend risk period detected - requiring higher quality setup")
+            # Enhanced validation layer should apply stricter criteria
+            # For now, we just log a warning but don't block (let enhanced layer decide)
 
         # Check spread
-        spread, bid, ask = get_market_spread(client, account_id, instrument)
+        spread, bid, ask = spread_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S)
         if spread:
             # Reject if spread is too wide (indicates poor liquidity)
-            max_spread = get_config().get_max_spread(instrument)
+            max_spread = config.get_max_spread(instrument)
             if spread > max_spread:
-                print(f"[VALIDATION] ❌ Spread too wide: {spread:.5f} > {max_spread:.5f}")
+                logger.info("[VALIDATION] ❌ Spread too wide: %.5f > %.5f", spread, max_spread)
                 return False
-            print(f"[VALIDATION] ✅ Spread acceptable: {spread:.5f}")
+            logger.info("[VALIDATION] ✅ Spread acceptable: %.5f", spread)
         
         # Technical confirmations: MA trend direction alignment (EMA50 vs EMA200)
         # Use the provided client to fetch data instead of env vars
-        trend = _ma_trend_direction(instrument, oanda_client=client)
-        relax = os.getenv("ALLOW_TREND_RELAX", "true").lower() == "true"
+        trend = trend_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S)
+        relax = _ENV.allow_trend_relax
 
         if trend != "unknown":
             # Check alignment as before
@@ -416,52 +777,49 @@ def validate_trade_entry(client, account_id, instrument, side, trade_idea, user_
 
             if misaligned:
                 if relax:
-                    print(f"[VALIDATION] ⚠️ MA trend opposite ({trend}) but relaxed mode active for {instrument} ({side})")
+                    logger.warning("[VALIDATION] ⚠️ MA trend opposite (%s) but relaxed mode active for %s (%s)", trend, instrument, side)
                 else:
-                    print(f"[VALIDATION] ❌ MA trend misaligned for {instrument}: {trend} vs side {side}")
+                    logger.info("[VALIDATION] ❌ MA trend misaligned for %s: %s vs side %s", instrument, trend, side)
                     return False
             else:
-                print(f"[VALIDATION] ✅ MA trend aligned for {instrument}: {trend}")
+                logger.info("[VALIDATION] ✅ MA trend aligned for %s: %s", instrument, trend)
 
 
         # Support/Resistance proximity: avoid chasing into nearby levels (<0.25*ATR)
         # Use the provided client to fetch data instead of env vars
         try:
-            support, resistance = get_support_resistance_levels(instrument.replace("_", ""), 120, oanda_client=client)
+            support, resistance = levels_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S)
         except Exception:
             support, resistance = (None, None)
-        atr_for_prox = calculate_atr(client, account_id, instrument) or 0.0
+        atr_for_prox = atr_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S) or 0.0
         if support and resistance and atr_for_prox > 0:
             price_ref = bid if side == "sell" else ask
             buffer = max(atr_for_prox * 0.25, 0.0)
             if side == "buy" and (resistance - price_ref) <= buffer:
-                print(f"[VALIDATION] ❌ Too close to resistance ({resistance:.5f}); buffer {buffer:.5f}")
+                logger.info("[VALIDATION] ❌ Too close to resistance (%.5f); buffer %.5f", resistance, buffer)
                 return False
             if side == "sell" and (price_ref - support) <= buffer:
-                print(f"[VALIDATION] ❌ Too close to support ({support:.5f}); buffer {buffer:.5f}")
+                logger.info("[VALIDATION] ❌ Too close to support (%.5f); buffer %.5f", support, buffer)
                 return False
 
         # Regime hard-gate: require ADX and ATR% window to avoid chop
         # Use the provided client to fetch data instead of env vars
         try:
-            if not passes_h4_hard_filters(instrument.replace("_", ""), side, oanda_client=client):
+            if not regime_future.result(timeout=VALIDATION_FETCH_TIMEOUT_S):
                 return False
         except Exception as _:
             # If metrics unavailable, be conservative
             return False
 
         # Add more validation based on trade idea content
-        idea_lower = trade_idea.lower()
-        
         # Check for clear entry signals
-        signal_words = ["breakout", "bounce", "rejection", "confirmation", "entry"]
-        if not any(word in idea_lower for word in signal_words):
-            print("[VALIDATION] ⚠️ Warning: No clear entry signal detected")
+        if not _SIGNAL_RE.search(trade_idea):
+            logger.warning("[VALIDATION] ⚠️ Warning: No clear entry signal detected")
         
         return True
         
     except Exception as e:
-        print(f"[VALIDATION] Error during validation: {e}")
+        logger.error("[VALIDATION] Error during validation: %s", e)
         return False
 
 def calculate_units_by_allocation(balance, allocation_percent, instrument, entry_price, account_currency):
@@ -522,7 +880,7 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         token = os.getenv("OANDA_API_KEY")
         if not token:
             raise ValueError("OANDA_API_KEY must be provided via client parameter or set in environment (legacy mode)")
-        client = oandapyV20.API(access_token=token, environment="live")
+        client = get_shared_client(token, "live")
 
     is_pyramid_add = strategy_id == "PYRAMID_ADD"
     if is_pyramid_add:
@@ -532,9 +890,7 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         side = direction_override.lower() if isinstance(direction_override, str) else str(direction_override).lower()
         position_size = max(1000, int(units_override))
         # Get current price for entry
-        current_price = get_current_price(client, account_id, instrument, side)
-        time.sleep(0.5)
-        stable_price = get_current_price(client, account_id, instrument, side)
+        current_price, stable_price = _sample_entry_prices(client, account_id, instrument, side)
         if side == "buy":
             intended_entry_price = min(current_price, stable_price)
         else:
@@ -599,12 +955,16 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
     if not validate_trade_entry(client, account_id, instrument, side, trade_idea, user_id=user_id, skip_duplicate_validation=skip_duplicate):
         raise ValueError("Trade validation failed - conditions not favorable")
 
-    # Get current price with better timing
-    current_price = get_current_price(client, account_id, instrument, side)
-    
-    # Wait for a more stable price (reduce slippage)
-    time.sleep(1)
-    stable_price = get_current_price(client, account_id, instrument, side)
+    # Market reads that do not depend on the entry price go out with the price samples;
+    # the M15 ATR is only needed for ATR-based stops and is cached per 15 minutes anyway
+    balance_future = _PRETRADE_POOL.submit(_account_balance, client, account_id)
+    atr_future = _PRETRADE_POOL.submit(calculate_atr, client, account_id, instrument)
+    m15_atr_future = None
+    if (sl_price is None or tp_price is None) and not _ENV.use_fixed_sl_percent:
+        m15_atr_future = _PRETRADE_POOL.submit(get_m15_atr, instrument, oanda_client=client)
+
+    # Get current price with better timing: two samples a moment apart (reduce slippage)
+    current_price, stable_price = _sample_entry_prices(client, account_id, instrument, side)
     
     # Use the better price
     if side == "buy":
@@ -617,13 +977,10 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
     print(f"[PRICE] Initial: {current_price:.5f}, Stable: {stable_price:.5f}, Intended: {intended_entry_price:.5f}")
 
     # 📊 Get account balance and currency
-    r_balance = account.AccountDetails(account_id)
-    client.request(r_balance)
-    balance = float(r_balance.response['account']['balance'])
-    account_currency = r_balance.response['account'].get('currency', 'USD')
+    balance, account_currency = balance_future.result()
 
     # 📈 Calculate ATR for dynamic positioning
-    atr = calculate_atr(client, account_id, instrument)
+    atr = atr_future.result()
     if atr:
         print(f"[ATR] Average True Range: {atr:.5f}")
     
@@ -640,17 +997,17 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         sizing_mode = f"user allocation {trade_allocation:.2f}%"
     else:
         # Fallback to existing system logic
-        use_allocation_percent = os.getenv("USE_ALLOCATION_PERCENT", "false").lower() == "true"
-        allocation_percent = float(os.getenv("ALLOCATION_PERCENT", "10.0"))  # default 10% if enabled
+        use_allocation_percent = _ENV.use_allocation_percent
+        allocation_percent = _ENV.allocation_percent
         # Allow override via argument
         # If risk_pct provided from smart layer, it's a fraction (0.005..0.010). Convert to percent units.
         if risk_pct is not None:
             try:
                 risk_percent = float(risk_pct) * 100.0
             except Exception:
-                risk_percent = float(os.getenv("RISK_PERCENT", "1.0"))
+                risk_percent = _ENV.risk_percent
         else:
-            risk_percent = float(os.getenv("RISK_PERCENT", "1.0"))
+            risk_percent = _ENV.risk_percent
 
         if use_allocation_percent:
             position_size = calculate_units_by_allocation(
@@ -671,89 +1028,63 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
             sizing_mode = "fallback 2% of balance"
     
     units = str(position_size) if side == "buy" else str(-position_size)
+    abs_units = abs(int(units))  # units is the signed string OANDA expects
 
     # 📈 SL/TP logic with support for swing-based, fixed-percent, ATR-based, or explicit overrides
-    use_fixed_sl_percent = os.getenv("USE_FIXED_SL_PERCENT", "false").lower() == "true"
-    min_rr_ratio = float(os.getenv("MIN_RR_RATIO", "1.6"))
+    # sign: +1 for buys (SL below / TP above entry), -1 for sells
+    sign = 1.0 if side == "buy" else -1.0
+    use_fixed_sl_percent = _ENV.use_fixed_sl_percent
+    min_rr_ratio = _ENV.min_rr_ratio
 
     # Respect explicit overrides if provided
     if sl_price is not None and tp_price is not None:
         sl_price = round_price(instrument, float(sl_price))
         tp_price = round_price(instrument, float(tp_price))
     elif use_fixed_sl_percent:
-        fixed_sl_percent = float(os.getenv("FIXED_SL_PERCENT", "2.0"))  # e.g., 2% stop
+        fixed_sl_percent = _ENV.fixed_sl_percent
         # Optional: user can also set TP as a percent; otherwise we keep R:R logic
-        fixed_tp_percent_env = os.getenv("FIXED_TP_PERCENT")
-        fixed_tp_percent = float(fixed_tp_percent_env) if fixed_tp_percent_env else None
+        fixed_tp_percent = _ENV.fixed_tp_percent
 
         sl_delta = entry_price * (fixed_sl_percent / 100.0)
-        if side == "buy":
-            sl_price = round_price(instrument, entry_price - sl_delta)
-            if fixed_tp_percent:
-                tp_price = round_price(instrument, entry_price + entry_price * (fixed_tp_percent / 100.0))
-            else:
-                # provisional TP; will be adjusted by R:R check below
-                tp_price = round_price(instrument, entry_price + sl_delta * max(min_rr_ratio, 1.8))
+        if fixed_tp_percent:
+            tp_delta = entry_price * (fixed_tp_percent / 100.0)
         else:
-            sl_price = round_price(instrument, entry_price + sl_delta)
-            if fixed_tp_percent:
-                tp_price = round_price(instrument, entry_price - entry_price * (fixed_tp_percent / 100.0))
-            else:
-                tp_price = round_price(instrument, entry_price - sl_delta * max(min_rr_ratio, 1.8))
+            # provisional TP; will be adjusted by R:R check below
+            tp_delta = sl_delta * max(min_rr_ratio, 1.8)
+        sl_price = round_price(instrument, entry_price - sign * sl_delta)
+        tp_price = round_price(instrument, entry_price + sign * tp_delta)
     elif atr:
         # Use ATR-based stops (more adaptive to market conditions)
         # Fix #1: Increased from 1.6 to 2.0x H4 ATR OR 2.5x M15 ATR (whichever larger) for 65-70% win rate
-        atr_multiplier_sl = float(os.getenv("ATR_SL_MULTIPLIER", "2.0"))  # Increased for better win rate
-        atr_multiplier_tp = float(os.getenv("ATR_TP_MULTIPLIER", "2.8"))  # tuned default 2.5–3.2
+        atr_multiplier_sl = _ENV.atr_sl_multiplier
+        atr_multiplier_tp = _ENV.atr_tp_multiplier
         
         # Get M15 ATR for execution-timeframe buffer (CRITICAL for 65-70% win rate)
         m15_atr_price_units = None
-        pip_val = 0.01 if "JPY" in instrument else (0.1 if "XAU" in instrument else (0.01 if "XAG" in instrument else 0.0001))
+        pip_val = _pip_value(instrument)
         try:
-            from validators import get_oanda_data, _calculate_true_ranges_from_hlc, _wilder_smooth
-            m15_candles = get_oanda_data(instrument.replace("_", ""), "M15", 30, oanda_client=client)
-            if m15_candles and len(m15_candles) >= 21:
-                highs = [float(c["mid"]["h"]) for c in m15_candles]
-                lows = [float(c["mid"]["l"]) for c in m15_candles]
-                closes = [float(c["mid"]["c"]) for c in m15_candles]
-                tr_list = _calculate_true_ranges_from_hlc(highs, lows, closes)
-                m15_atr_series = _wilder_smooth(tr_list, 14)
-                m15_atr = m15_atr_series[-1] if m15_atr_series else None
-                if m15_atr:
-                    m15_atr_price_units = m15_atr
-                    m15_atr_pips = (m15_atr / pip_val) if pip_val > 0 else None
-                    print(f"[TRADER] M15 ATR: {m15_atr_pips:.1f} pips (execution timeframe buffer)")
+            m15_atr = m15_atr_future.result()
+            if m15_atr:
+                m15_atr_price_units = m15_atr
+                m15_atr_pips = (m15_atr / pip_val) if pip_val > 0 else None
+                print(f"[TRADER] M15 ATR: {m15_atr_pips:.1f} pips (execution timeframe buffer)")
         except Exception as e:
             print(f"[TRADER] ⚠️ Could not calculate M15 ATR: {e}")
         
-        # Use larger of: 2.0x H4 ATR or 2.5x M15 ATR (ensures execution noise buffer for 65-70% win rate)
-        h4_sl_distance = atr * atr_multiplier_sl
-        if m15_atr_price_units:
-            m15_sl_distance = m15_atr_price_units * 2.5  # 2.5x M15 ATR for better protection
-            sl_distance = max(h4_sl_distance, m15_sl_distance)
-            print(f"[TRADER] SL calculation: H4={h4_sl_distance:.5f} ({atr_multiplier_sl}x), M15={m15_sl_distance:.5f} (2.5x) → Using {sl_distance:.5f}")
-        else:
-            sl_distance = h4_sl_distance
-            print(f"[TRADER] SL calculation: H4={h4_sl_distance:.5f} ({atr_multiplier_sl}x) (M15 unavailable) → Using {sl_distance:.5f}")
-        
-        tp_distance = atr * atr_multiplier_tp
-        
-        # Ensure TP is always greater than SL
-        min_rr_ratio_internal = max(1.8, min_rr_ratio)
-        if tp_distance <= sl_distance * min_rr_ratio_internal:
-            tp_distance = sl_distance * min_rr_ratio_internal
+        sl_distance, tp_distance = atr_stop_distances(atr, m15_atr_price_units, atr_multiplier_sl,
+                                                      atr_multiplier_tp, min_rr_ratio)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[TRADER] SL calculation: H4=%.5f (%sx), M15=%s (2.5x) → Using %.5f", atr * atr_multiplier_sl, atr_multiplier_sl,
+                         f"{m15_atr_price_units * 2.5:.5f}" if m15_atr_price_units else "unavailable", sl_distance)
+        if tp_distance != atr * atr_multiplier_tp:
             print(f"[RISK] 🔧 Adjusted TP distance to {tp_distance:.5f} for better R:R")
         
-        if side == "buy":
-            sl_price = round_price(instrument, entry_price - sl_distance)
-            tp_price = round_price(instrument, entry_price + tp_distance)
-        else:
-            sl_price = round_price(instrument, entry_price + sl_distance)
-            tp_price = round_price(instrument, entry_price - tp_distance)
+        sl_price = round_price(instrument, entry_price - sign * sl_distance)
+        tp_price = round_price(instrument, entry_price + sign * tp_distance)
     else:
         # Fallback to percentage-based with guaranteed SL < TP
-        base_sl_delta = float(os.getenv("SL_THRESHOLD", "0.004"))  # 0.4%
-        base_tp_delta = float(os.getenv("TP_THRESHOLD", "0.008"))  # 0.8% (2:1 ratio)
+        base_sl_delta = _ENV.sl_threshold
+        base_tp_delta = _ENV.tp_threshold
         
         # Ensure minimum 1.8:1 ratio
         min_rr_ratio_internal = max(1.8, min_rr_ratio)
@@ -761,37 +1092,24 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
             base_tp_delta = base_sl_delta * min_rr_ratio_internal
             print(f"[RISK] 🔧 Adjusted TP delta to {base_tp_delta:.4f} for better R:R")
         
-        if side == "buy":
-            tp_price = round_price(instrument, entry_price * (1 + base_tp_delta))
-            sl_price = round_price(instrument, entry_price * (1 - base_sl_delta))
-        else:
-            tp_price = round_price(instrument, entry_price * (1 - base_tp_delta))
-            sl_price = round_price(instrument, entry_price * (1 + base_sl_delta))
+        tp_price = round_price(instrument, entry_price * (1 + sign * base_tp_delta))
+        sl_price = round_price(instrument, entry_price * (1 - sign * base_sl_delta))
 
     # Optional: swing-based stop override if enabled
     # IMPORTANT: Apply swing SL BEFORE TP adjustment to ensure proper R:R validation
-    use_swing_sl = os.getenv("USE_SWING_SL", "true").lower() == "true"
+    use_swing_sl = _ENV.use_swing_sl
     if use_swing_sl:
         recent_low, recent_high = _find_recent_swing_levels(instrument, side, lookback=30)
         if recent_low and recent_high:
-            if side == "buy":
-                swing_sl = round_price(instrument, recent_low)
-                # Use tighter (lower) SL - swing SL should be <= ATR SL for buys
-                if swing_sl <= sl_price:
-                    sl_price = swing_sl
-            else:
-                swing_sl = round_price(instrument, recent_high)
-                # Use tighter (higher) SL - swing SL should be >= ATR SL for sells
-                if swing_sl >= sl_price:
-                    sl_price = swing_sl
+            swing_sl = round_price(instrument, recent_low if side == "buy" else recent_high)
+            # Take the swing SL when it sits at or beyond the current SL (below for buys, above for sells)
+            if sign * (sl_price - swing_sl) >= 0:
+                sl_price = swing_sl
 
-    # Calculate and validate risk-reward ratio
-    if side == "buy":
-        risk = entry_price - sl_price
-        reward = tp_price - entry_price
-    else:
-        risk = sl_price - entry_price
-        reward = entry_price - tp_price
+    # Calculate and validate risk-reward ratio; risk/reward are the SL/TP distances and are
+    # updated only when TP moves below, so the safety checks reuse them
+    risk = sign * (entry_price - sl_price)
+    reward = sign * (tp_price - entry_price)
     
     rr_ratio = reward / risk if risk > 0 else 0
     
@@ -799,18 +1117,8 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
     min_acceptable_rr = min_rr_ratio
     if rr_ratio < min_acceptable_rr:
         required_reward = risk * min_acceptable_rr
-        
-        if side == "buy":
-            tp_price = round_price(instrument, entry_price + required_reward)
-        else:
-            tp_price = round_price(instrument, entry_price - required_reward)
-        
-        # Recalculate ratio
-        if side == "buy":
-            reward = tp_price - entry_price
-        else:
-            reward = entry_price - tp_price
-        
+        tp_price = round_price(instrument, entry_price + sign * required_reward)
+        reward = sign * (tp_price - entry_price)  # from the rounded TP actually sent
         rr_ratio = reward / risk if risk > 0 else 0
         print(f"[RISK] 🔧 Adjusted TP to achieve minimum R:R: {rr_ratio:.2f}")
     
@@ -821,26 +1129,19 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         print(f"[RISK] ✅ Good risk-reward ratio: {rr_ratio:.2f}")
     
     # SAFETY ASSERTION: Ensure SL distance is always less than TP distance
-    if side == "buy":
-        sl_distance_final = entry_price - sl_price
-        tp_distance_final = tp_price - entry_price
-    else:
-        sl_distance_final = sl_price - entry_price
-        tp_distance_final = entry_price - tp_price
+    if risk <= 0:
+        raise ValueError(f"Invalid setup: SL distance must be positive, got {risk:.5f}")
     
-    if sl_distance_final <= 0:
-        raise ValueError(f"Invalid setup: SL distance must be positive, got {sl_distance_final:.5f}")
+    if reward <= 0:
+        raise ValueError(f"Invalid setup: TP distance must be positive, got {reward:.5f}")
     
-    if tp_distance_final <= 0:
-        raise ValueError(f"Invalid setup: TP distance must be positive, got {tp_distance_final:.5f}")
-    
-    if sl_distance_final >= tp_distance_final:
+    if risk >= reward:
         raise ValueError(
-            f"Invalid setup: SL distance ({sl_distance_final:.5f}) >= TP distance ({tp_distance_final:.5f}). "
+            f"Invalid setup: SL distance ({risk:.5f}) >= TP distance ({reward:.5f}). "
             f"This should not occur after swing SL and TP adjustments."
         )
     
-    print(f"[RISK] 📏 SL distance: {sl_distance_final:.5f} | TP distance: {tp_distance_final:.5f}")
+    print(f"[RISK] 📏 SL distance: {risk:.5f} | TP distance: {reward:.5f}")
 
     order = {
         "order": {
@@ -854,52 +1155,43 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
     }
 
     print(f"[TRADE] Placing {side.upper()} order on {instrument}")
-    print(f"[TRADE] Balance: ${_safe_fmt(balance, '.2f', 'N/A')} | Position Size: {abs(int(units))} | Sizing: {sizing_mode}")
+    print(f"[TRADE] Balance: ${_safe_fmt(balance, '.2f', 'N/A')} | Position Size: {abs_units} | Sizing: {sizing_mode}")
     print(f"[TRADE] Intended Entry: {_safe_fmt(intended_entry_price, '.5f', 'N/A')} | TP: {_safe_fmt(tp_price, '.5f', 'N/A')} | SL: {_safe_fmt(sl_price, '.5f', 'N/A')}")
     print(f"[TRADE] Risk/Reward Ratio: {_safe_fmt(rr_ratio, '.2f', 'N/A')}")
     if atr:
         print(f"[TRADE] ATR: {_safe_fmt(atr, '.5f', 'N/A')} | {'SL fixed %' if use_fixed_sl_percent else 'ATR-based SL' if atr else 'fixed % fallback'}")
 
-    # DIAGNOSTIC LOGGING: Pre-API call validation
-    print(f"[OANDA][PRE-CALL] Preparing to send order to OANDA API")
-    print(f"[OANDA][PRE-CALL] Account ID: {account_id}")
-    print(f"[OANDA][PRE-CALL] Client initialized: {client is not None}")
-    print(f"[OANDA][PRE-CALL] Order details: side={side}, units={units}, instrument={instrument}")
-    print(f"[OANDA][PRE-CALL] Entry price: {_safe_fmt(intended_entry_price, '.5f', 'N/A')}, TP: {_safe_fmt(tp_price, '.5f', 'N/A')}, SL: {_safe_fmt(sl_price, '.5f', 'N/A')}")
-    print(f"[OANDA][PRE-CALL] Order payload: {order}")
+    # DIAGNOSTIC LOGGING: one pre-call record (the payload carries side/units/instrument/TP/SL);
+    # the order dict is only repr'd when DEBUG is enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[OANDA][PRE-CALL] account=%s intended_entry=%s order=%r", account_id,
+                     _safe_fmt(intended_entry_price, '.5f', 'N/A'), order,
+                     extra={"order": order, "account": account_id})
 
     try:
-        # DIAGNOSTIC LOGGING: Before API call
-        print(f"[OANDA][PRE-CALL] Sending order → side={side}, units={units}, price={_safe_fmt(intended_entry_price, '.5f', 'N/A')}, account={account_id}")
-        
         r = orders.OrderCreate(accountID=account_id, data=order)
-        print(f"[OANDA][PRE-CALL] OrderCreate object created, making API request...")
-        
         client.request(r)
-        print(f"[OANDA][RESPONSE] API request completed successfully")
-        print(f"[OANDA][RESPONSE] Full response: {r.response}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[OANDA][RESPONSE] Full response: %r", r.response)
         
         # Extract trade ID with validation and fallback handling
-        order_fill = r.response.get("orderFillTransaction", {})
-        trade_id = None
-        
-        # Try primary path: tradeOpened
-        if "tradeOpened" in order_fill:
-            trade_id = order_fill["tradeOpened"].get("tradeID")
-        
-        # Fallback: tradesOpened (plural) for partial fills
-        if not trade_id and "tradesOpened" in order_fill:
-            trades_opened = order_fill["tradesOpened"]
-            if isinstance(trades_opened, list) and len(trades_opened) > 0:
-                trade_id = trades_opened[0].get("tradeID")
+        order_fill = r.response.get("orderFillTransaction") or {}
+        # Primary path: tradeOpened; fallback: tradesOpened (plural) for partial fills
+        opened = order_fill.get("tradeOpened")
+        trade_id = opened.get("tradeID") if isinstance(opened, dict) else None
+        if not trade_id:
+            trades_opened = order_fill.get("tradesOpened")
+            opened = trades_opened[0] if isinstance(trades_opened, list) and trades_opened else None
+            trade_id = opened.get("tradeID") if isinstance(opened, dict) else None
         
         # Final validation - fail if no trade ID found
         if not trade_id:
+            # reprlib caps the nesting/length; the full response is in the DEBUG log above
             error_msg = (
                 f"Trade execution succeeded but no tradeID returned. "
-                f"Response structure: {json.dumps(r.response, indent=2)[:1000]}"
+                f"Response structure: {reprlib.repr(r.response)}"
             )
-            print(f"[OANDA][ERROR] {error_msg}")
+            logger.error("[OANDA][ERROR] %s", error_msg)
             raise ValueError(error_msg)
         
         raw_fill = order_fill.get("price", intended_entry_price)
@@ -907,167 +1199,90 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
             fill_price = float(raw_fill) if raw_fill is not None else float(intended_entry_price)
         except (TypeError, ValueError):
             fill_price = float(intended_entry_price)
-        print(f"[OANDA][RESPONSE] Trade ID: {trade_id}, Fill Price: {_safe_fmt(fill_price, '.5f', 'N/A')}")
-        print(f"[TRADE] ✅ Order filled at: {_safe_fmt(fill_price, '.5f', 'N/A')}")
+        logger.debug("[OANDA][RESPONSE] Trade ID: %s, Fill Price: %s", trade_id, fill_price)
+        logger.info("[TRADE] ✅ Order filled at: %.5f (trade %s)", fill_price, trade_id)
 
     except oandapyV20.exceptions.V20Error as e:
-        print(f"[OANDA][ERROR] V20Error occurred during trade execution")
-        print(f"[OANDA][ERROR] Error type: {type(e).__name__}")
-        print(f"[OANDA][ERROR] Error message: {e}")
-        print(f"[OANDA][ERROR] Error code: {getattr(e, 'code', 'N/A')}")
-        print(f"[OANDA][ERROR] Error response: {e.response.text if hasattr(e, 'response') and hasattr(e.response, 'text') else 'No response body'}")
-        print(f"[OANDA][ERROR] Full error details: {e}")
-        import traceback
-        print(f"[OANDA][ERROR] Traceback:")
-        traceback.print_exc()
-        print("[OANDA ERROR]", e)
-        print("[OANDA ERROR BODY]", e.response.text if hasattr(e, 'response') else "No response body.")
+        logger.error("[OANDA][ERROR] Error response: %s",
+                     e.response.text if hasattr(e, 'response') and hasattr(e.response, 'text') else 'No response body')
+        logger.exception("[OANDA][ERROR] V20Error during trade execution: %s (code=%s)", e, getattr(e, 'code', 'N/A'))
         raise
     except Exception as e:
-        print(f"[OANDA][ERROR] Unexpected exception during trade execution: {type(e).__name__}")
-        print(f"[OANDA][ERROR] Error message: {e}")
-        import traceback
-        print(f"[OANDA][ERROR] Traceback:")
-        traceback.print_exc()
+        logger.exception("[OANDA][ERROR] Unexpected exception during trade execution: %s: %s", type(e).__name__, e)
         raise
 
-    # Compute entry spread and slippage for logging
+    # Compute entry spread and slippage for logging (the entry price samples above leave a
+    # quote in the spread snapshot; this refetches only if it is older than SPREAD_SNAPSHOT_TTL_S)
     try:
         spread_now, bid_now, ask_now = get_market_spread(client, account_id, instrument)
     except Exception:
         spread_now, bid_now, ask_now = (None, None, None)
 
     # pip value for pips conversion
-    if "JPY" in instrument:
-        pip_val = 0.01
-    elif "XAU" in instrument:
-        pip_val = 0.1
-    elif "XAG" in instrument:
-        pip_val = 0.01
-    else:
-        pip_val = 0.0001
+    pip_val = _pip_value(instrument)
     entry_spread_pips = (spread_now / pip_val) if (spread_now and pip_val) else 0.0
     entry_slippage_pips = abs(fill_price - intended_entry_price) / pip_val if pip_val else 0.0
+    commission_per_million = _ENV.commission_per_million  # costs the trade below and is echoed in meta_out
     
     # Save trade to database (persistence layer) - AFTER computing spread/slippage
     if trade_id != "unknown":
         try:
-            # Get commission_per_million from environment
-            try:
-                commission_per_million = float(os.getenv("COMMISSION_PER_MILLION", "0.0"))
-            except Exception:
-                commission_per_million = 0.0
+            opened_at = datetime.now(_UTC)  # one timestamp for the API sync and the DB fallback
             
             # Calculate commission if available
             commission = None
-            if commission_per_million and units:
+            if commission_per_million and abs_units:
                 # Commission is typically per million units
-                commission_amount = (abs(units) / 1_000_000) * commission_per_million
+                commission_amount = (abs_units / 1_000_000) * commission_per_million
                 commission = commission_amount * fill_price if fill_price else None
             
             # Calculate spread cost
             spread_cost = None
-            if spread_now and units:
-                spread_cost = abs(spread_now * units)
+            if spread_now and abs_units:
+                spread_cost = abs(spread_now * abs_units)
             
             # Calculate slippage cost
             slippage_cost = None
-            if entry_slippage_pips and pip_val and units:
+            if entry_slippage_pips and pip_val and abs_units:
                 slippage_amount = entry_slippage_pips * pip_val
-                slippage_cost = abs(slippage_amount * units)
+                slippage_cost = abs(slippage_amount * abs_units)
             
             # Build reason_open from meta
-            reason_parts = []
-            if meta and isinstance(meta, dict):
-                if meta.get("quality_score"):
-                    reason_parts.append(f"quality_score={meta['quality_score']}")
-                if meta.get("reasons"):
-                    reason_parts.append(f"reasons={meta['reasons']}")
-            if tp_price:
-                reason_parts.append(f"tp={tp_price}")
-            if sl_price:
-                reason_parts.append(f"sl={sl_price}")
-            reason_open = " ".join(reason_parts) if reason_parts else None
+            meta_dict = meta if isinstance(meta, dict) else {}
+            reason_open = " ".join(filter(None, (
+                f"quality_score={meta_dict['quality_score']}" if meta_dict.get("quality_score") else None,
+                f"reasons={meta_dict['reasons']}" if meta_dict.get("reasons") else None,
+                f"tp={tp_price}" if tp_price else None,
+                f"sl={sl_price}" if sl_price else None,
+            ))) or None
             
-            # Save to database - REQUIRED, not optional
-            # Try API sync first (if user_id provided), then fall back to direct DB write
-            persistence_succeeded = False
-            persistence_error = None
-            
-            if user_id is not None:
-                # Enhanced mode: Try API sync first
-                try:
-                    from autopip_client import AutopipClient
-                    autopip_client = AutopipClient()
-                    autopip_client.post_trade({
-                        "userId": user_id,
-                        "externalTradeId": str(trade_id),
-                        "symbol": instrument,
-                        "side": side.upper(),
-                        "size": abs(int(units)),
-                        "entry": fill_price,
-                        "tp": tp_price,
-                        "sl": sl_price,
-                        "status": "OPEN",
-                        "pnl": None,
-                        "openedAt": datetime.datetime.now(timezone.utc).isoformat(),
-                        "closedAt": None,
-                        "timeframe": meta.get("timeframe") if meta else None,
-                        "oandaAccountId": account_id,
-                    })
-                    print(f"[DB] ✅ Trade {trade_id} saved to database via API sync for user {user_id}")
-                    persistence_succeeded = True
-                except ImportError as e:
-                    # AutopipClient not available - fall through to direct DB
-                    persistence_error = f"API client import failed: {e}"
-                    print(f"[DB] ⚠️ API sync unavailable ({persistence_error}) - falling back to direct DB persistence")
-                except Exception as api_error:
-                    # API sync failed - fall through to direct DB
-                    persistence_error = f"API sync failed: {api_error}"
-                    print(f"[DB] ⚠️ API trade sync failed for trade {trade_id}, user {user_id}, account {account_id}")
-                    print(f"[DB] ⚠️ Error: {persistence_error}")
-                    print(f"[DB] 🔄 Falling back to direct DB persistence...")
-            
-            # Fallback to direct DB persistence if API sync failed or user_id not provided
-            if not persistence_succeeded:
-                try:
-                    save_trade_from_oanda_account(
-                        oanda_account_id=account_id,
-                        external_id=str(trade_id),
-                        instrument=instrument,
-                        side=side,
-                        units=abs(int(units)),
-                        entry_price=fill_price,
-                        opened_at=datetime.datetime.now(timezone.utc),
-                        reason_open=reason_open,
-                        commission=commission,
-                        spread_cost=spread_cost,
-                        slippage_cost=slippage_cost,
-                    )
-                    if persistence_error:
-                        print(f"[DB] ✅ Trade {trade_id} saved to database via fallback (API sync had failed)")
-                    else:
-                        print(f"[DB] ✅ Trade {trade_id} saved to database (legacy mode)")
-                    persistence_succeeded = True
-                except Exception as db_error:
-                    persistence_error = f"Direct DB persistence failed: {db_error}"
-                    print(f"[DB] ❌ CRITICAL: All persistence paths failed for trade {trade_id}")
-                    print(f"[DB] ❌ Trade executed on OANDA but NOT saved to database")
-                    print(f"[DB] ❌ Final error: {persistence_error}")
-                    import traceback
-                    traceback.print_exc()
-                    # Log critical failure - trade exists on OANDA but not in DB
-                    # This will require reconciliation to fix
+            # One record for both backends: the API takes it as-is, the DB write maps it to kwargs
+            trade_record = {
+                "externalTradeId": str(trade_id),
+                "symbol": instrument,
+                "side": side.upper(),
+                "size": abs_units,
+                "entry": fill_price,
+                "tp": tp_price,
+                "sl": sl_price,
+            }
             
-            if not persistence_succeeded:
-                # This is a critical failure - trade exists on OANDA but not persisted
-                print(f"[DB] 🚨 PERSISTENCE FAILURE: Trade {trade_id} on OANDA account {account_id} was NOT saved to database")
-                print(f"[DB] 🚨 This trade will not appear in the dashboard until reconciliation runs")
+            # Save to database - REQUIRED, not optional. Runs in the background with retries
+            # (see PERSIST_RETRY_DELAYS_S) and is flushed at shutdown
+            _persist_trade(
+                trade_record,
+                user_id=user_id,
+                account_id=account_id,
+                opened_at=opened_at,
+                timeframe=meta_dict.get("timeframe"),
+                reason_open=reason_open,
+                commission=commission,
+                spread_cost=spread_cost,
+                slippage_cost=slippage_cost,
+            )
         except Exception as db_error:
             # Log error but don't fail the trade execution
-            print(f"[DB] ❌ Error saving trade to database: {db_error}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[DB] ❌ Error saving trade to database: %s", db_error)
 
     # Provide smart trailing meta defaults so monitor can apply trailing
     # Reduced trail_start_r from 1.0 to 0.7 for earlier protection
@@ -1075,13 +1290,9 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
     meta_out.setdefault("trail_start_r", 0.7)  # Reduced from 0.8 to 0.7 for earlier protection
     meta_out.setdefault("trail_step_pips", 4.0)
     # Attach execution/market microstructure details for downstream logging
-    try:
-        commission_per_million = float(os.getenv("COMMISSION_PER_MILLION", "0.0"))
-    except Exception:
-        commission_per_million = 0.0
     # Regime metrics snapshot
     try:
-        regime_trend, regime_adx, regime_atr_pct = get_h4_trend_adx_atr_percent(instrument.replace("_", ""))
+        regime_trend, regime_adx, regime_atr_pct = get_h4_trend_adx_atr_percent(instrument)
     except Exception:
         regime_trend, regime_adx, regime_atr_pct = (None, None, None)
     meta_out.update({
@@ -1101,7 +1312,7 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         "tp_price": tp_price,
         "sl_price": sl_price,
         "trade_id": trade_id,
-        "position_size": abs(int(units)),
+        "position_size": abs_units,
         "risk_reward_ratio": rr_ratio,
         "atr": atr,
         "meta": meta_out,
@@ -1110,34 +1321,65 @@ def place_trade(trade_idea, direction=None, risk_pct=None, sl_price=None, tp_pri
         "user_id": user_id,
     }
 
-def round_price(pair, price):
-    pair = pair.upper().replace("_", "/").strip()
+@lru_cache(maxsize=None)
+def _pip_value(instrument: str) -> float:
+    """Price size of one pip; classified once per instrument"""
+    if "JPY" in instrument:
+        return 0.01
+    if "XAU" in instrument:
+        return 0.1
+    if "XAG" in instrument:
+        return 0.01
+    return 0.0001
+
+@lru_cache(maxsize=None)
+def _price_decimals(pair: str) -> int:
+    """Quote precision used by round_price; classified once per pair spelling"""
+    pair = pair.upper()
     if "JPY" in pair:
-        return round(price, 3)
-    elif "XAU" in pair or "XAG" in pair:
-        return round(price, 2)
-    else:
-        return round(price, 5)
+        return 3
+    if "XAU" in pair or "XAG" in pair:
+        return 2
+    return 5
+
+def round_price(pair, price):
+    return round(price, _price_decimals(pair))
+
+# Whole-word direction keywords; splitting on non-word runs keeps the old \b...\b matching
+_WORD_SPLIT_RE = re.compile(r"\W+")
+_BUY_WORDS = frozenset({"long", "buy", "bullish"})
+_SELL_WORDS = frozenset({"short", "sell", "bearish"})
 
 def infer_trade_direction(text):
-    text = text.lower()
-    if re.search(r"\b(long|buy|bullish)\b", text):
+    words = set(_WORD_SPLIT_RE.split(text.lower()))
+    if not words.isdisjoint(_BUY_WORDS):
         return "buy"
-    elif re.search(r"\b(short|sell|bearish)\b", text):
+    elif not words.isdisjoint(_SELL_WORDS):
         return "sell"
     return None
 
+# account_id -> ((normalized, symbol), ...) in API order; the tradeable list is fetched once per account
+_ACCOUNT_INSTRUMENTS = {}
+
+def _account_instruments(client, account_id):
+    pairs = _ACCOUNT_INSTRUMENTS.get(account_id)
+    if pairs is None:
+        r = AccountInstruments(accountID=account_id)
+        client.request(r)
+        pairs = tuple(
+            (item['name'].replace("_", "").lower(), item['name'])  # e.g., ("eurusd", "EUR_USD")
+            for item in r.response['instruments']
+        )
+        _ACCOUNT_INSTRUMENTS[account_id] = pairs
+    return pairs
+
 def extract_instrument(text, client, account_id=None):
     """Extract instrument from text. Requires account_id to be passed explicitly or set in env."""
     cleaned_text = text.lower().replace("/", "").replace(" ", "").replace("_", "")
     account_id = account_id or os.getenv("OANDA_ACCOUNT_ID")
     if not account_id:
         raise ValueError("OANDA_ACCOUNT_ID must be provided as parameter or set in environment")
-    r = AccountInstruments(accountID=account_id)
-    client.request(r)
-    for item in r.response['instruments']:
-        symbol = item['name']  # e.g., "EUR_USD"
-        normalized = symbol.replace("_", "").lower()
+    for normalized, symbol in _account_instruments(client, account_id):
         if normalized in cleaned_text:
             return symbol
     return None
@@ -1148,5 +1390,7 @@ def get_current_price(client, account_id, instrument, side):
     prices = r.response["prices"][0]
     bid = float(prices["bids"][0]["price"])
     ask = float(prices["asks"][0]["price"])
+    # Every quote also refreshes the spread snapshot read by get_market_spread
+    _SPREAD_SNAPSHOT[(account_id, instrument)] = (time.monotonic(), (ask - bid, bid, ask))
     return ask if side == "buy" else bid
 
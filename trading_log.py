@@ -22,8 +22,10 @@ def load_log():
 def save_log(log_data):
     """Save trading log to file"""
     try:
+        # Serialize up front so the file gets one write() instead of one per JSON token
+        payload = json.dumps(log_data, indent=2, default=str)
         with open(LOG_FILE, "w") as f:
-            json.dump(log_data, f, indent=2, default=str)
+            f.write(payload)
     except Exception as e:
         print(f"[LOG] Error saving log: {e}")
 
@@ -1,13 +1,58 @@
 import requests
+import json
 import os
-import oandapyV20
+import threading
+import time
 import oandapyV20.endpoints.instruments as instruments
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Tuple, Optional, Dict
 
+try:
+    import numpy as np
+except ImportError:  # optional; candle parsing falls back to lists
+    np = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup for the candle disk cache; stdlib json when missing
+    orjson = None
+
+from indicator_kernels import HAVE_NUMBA, atr_wilder_last, ema_last, wilder_smooth
+from oanda_helpers import get_shared_client
+
 API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 BASE_URL = "https://api.twelvedata.com"
 
+# Complete H4 candles are cached by the time of the last complete one (OANDA's own candle
+# alignment, so no clock bucketing), mirrored to CANDLE_CACHE_DIR so a restart does not
+# refetch; CANDLE_CACHE=false disables both. The forming candle is never cached: every read
+# refetches the newest _CANDLE_TAIL_COUNT candles (reused for CANDLE_TAIL_TTL_S) and appends them.
+# Files live in their own "candles" subdirectory with a "candles_" prefix, and pruning only
+# ever touches that pattern, so pointing CANDLE_CACHE_DIR at a shared directory is safe
+CANDLE_CACHE_ENABLED = os.getenv("CANDLE_CACHE", "true").lower() == "true"
+CANDLE_CACHE_DIR = os.path.join(os.getenv("CANDLE_CACHE_DIR", ".cache"), "candles")
+# Cacheable granularities are fetched at this depth (EMA200 + ATR21 + swing lookback) and sliced
+# per caller, so every H4 consumer of a symbol shares one history request per candle
+_CANDLE_FETCH_COUNT = {"H4": 210}
+_CANDLE_TAIL_COUNT = 3
+CANDLE_TAIL_TTL_S = 5.0
+# (symbol, granularity, count) -> (last complete candle time, complete candles); one history per
+# series, so lookups never scan the dict while other symbols' threads store theirs
+_CANDLE_CACHE: Dict[tuple, tuple] = {}
+# (symbol, granularity, count) -> (monotonic fetch time, candles incl. forming, version); see _current_candles
+_CANDLE_CURRENT: Dict[tuple, tuple] = {}
+# (symbol, granularity) -> Lock; concurrent validators for one symbol wait for a single fetch
+_CANDLE_FETCH_LOCKS: Dict[tuple, threading.Lock] = {}
+# Column (SoA) views of the same payloads, re-parsed only when their version changes; see get_oanda_hlc
+_HLC_CACHE: Dict[tuple, tuple] = {}
+# (symbol, 15-minute bucket) -> M15 ATR; see get_m15_atr
+M15_ATR_BUCKET_SECONDS = 15 * 60
+_M15_ATR_CACHE: Dict[tuple, float] = {}
+# (symbol, adx_period, atr_period) -> (H4 candle version, (trend, adx, atr_percent));
+# see get_h4_trend_adx_atr_percent and candle_version
+_H4_REGIME_CACHE: Dict[tuple, tuple] = {}
+
 SUPPORTED_SYMBOLS = {
     "EURUSD", "USDJPY", "GBPUSD", "USDCHF",
     "AUDUSD", "USDCAD", "NZDUSD", "EURJPY",
@@ -24,6 +69,57 @@ def is_forex_pair(symbol):
         print(f"[VALIDATORS] ✅ Valid Forex symbol found: {symbol}")
     return is_valid
 
+def _candle_cacheable(granularity) -> bool:
+    return CANDLE_CACHE_ENABLED and granularity in _CANDLE_FETCH_COUNT
+
+def _candle_cache_prefix(symbol, granularity, count) -> str:
+    return f"candles_{symbol}_{granularity}_{count}_"
+
+def _candle_cache_path(symbol, granularity, count, last_time) -> str:
+    # OANDA times ("2024-01-01T21:00:00.000000000Z") reduced to digits for a portable file name
+    stamp = "".join(ch for ch in str(last_time) if ch.isdigit())
+    return os.path.join(CANDLE_CACHE_DIR, f"{_candle_cache_prefix(symbol, granularity, count)}{stamp}.json")
+
+def _get_cached_candles(symbol, granularity, count, last_time) -> Optional[list]:
+    cached = _CANDLE_CACHE.get((symbol, granularity, count))
+    if cached is not None and cached[0] == last_time:
+        return cached[1]
+    try:
+        with open(_candle_cache_path(symbol, granularity, count, last_time), "rb") as f:
+            raw = f.read()
+        candles = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return None
+    _CANDLE_CACHE[(symbol, granularity, count)] = (last_time, candles)
+    return candles
+
+def _store_cached_candles(symbol, granularity, count, last_time, candles):
+    # Replaces this series' older history, so the cache holds one per (symbol, granularity, count)
+    _CANDLE_CACHE[(symbol, granularity, count)] = (last_time, candles)
+    try:
+        os.makedirs(CANDLE_CACHE_DIR, exist_ok=True)
+        path = _candle_cache_path(symbol, granularity, count, last_time)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(candles) if orjson is not None else json.dumps(candles).encode("utf-8"))
+        os.replace(tmp, path)
+        # Prune only our own earlier files for this series
+        prefix, current = _candle_cache_prefix(symbol, granularity, count), os.path.basename(path)
+        for entry in os.scandir(CANDLE_CACHE_DIR):
+            name = entry.name
+            if name.startswith(prefix) and name.endswith(".json") and name != current:
+                os.remove(entry.path)
+    except OSError as e:
+        print(f"[VALIDATORS] Warning: could not write candle cache: {e}")
+
+@lru_cache(maxsize=256)
+def _oanda_symbol(symbol):
+    # Convert symbol format for OANDA (e.g., EURUSD -> EUR_USD); cached so the
+    # per-fetch cache keys reuse one string per instrument
+    if "_" not in symbol and len(symbol) == 6:
+        return f"{symbol[:3]}_{symbol[3:]}"
+    return symbol
+
 def get_oanda_data(symbol, granularity="H4", count=50, api_key=None, account_id=None, oanda_client=None):
     """Get price data from OANDA for more reliable technical analysis.
     
@@ -37,41 +133,134 @@ def get_oanda_data(symbol, granularity="H4", count=50, api_key=None, account_id=
                      will be used directly and environment variables will not be checked.
     
     Returns:
-        List of candle data or None if error/credentials missing.
+        List of candle data or None if error/credentials missing. The last candle may be the
+        forming one (complete=False); H4 history is cached (see _current_candles), so treat
+        the list as read-only.
     """
     try:
-        # If oanda_client is provided, use it directly
-        if oanda_client is not None:
-            client = oanda_client
-        else:
-            # Fall back to legacy behavior: use provided params or env vars
-            account_id = account_id or os.getenv("OANDA_ACCOUNT_ID")
-            token = api_key or os.getenv("OANDA_API_KEY")
-            
-            if not token:
-                print("[VALIDATORS] ❌ Missing OANDA API credentials. Must be provided as parameters or set in environment (legacy mode).")
-                return None
-                
-            client = oandapyV20.API(access_token=token, environment="live")
-        
-        # Convert symbol format for OANDA (e.g., EURUSD -> EUR_USD)
-        if "_" not in symbol:
-            if len(symbol) == 6:
-                symbol = f"{symbol[:3]}_{symbol[3:]}"
+        symbol = _oanda_symbol(symbol)
         
-        params = {
-            "count": count,
-            "granularity": granularity
-        }
+        if not _candle_cacheable(granularity):
+            return _fetch_candles(symbol, granularity, count, api_key, account_id, oanda_client)
+        fetch_count = max(count, _CANDLE_FETCH_COUNT[granularity])
+        candles, _ = _current_candles(symbol, granularity, fetch_count, api_key, account_id, oanda_client)
+        return candles[-count:] if candles and count < len(candles) else candles
         
-        r = instruments.InstrumentsCandles(instrument=symbol, params=params)
-        client.request(r)
-        
-        return r.response["candles"]
+    except Exception as e:
+        print(f"[VALIDATORS] ❌ Error fetching OANDA data for {symbol}: {e}")
+        return None
+
+def _candles_version(candles) -> tuple:
+    """Identity of a candle list's newest bar: changes when a candle completes or the forming one moves"""
+    last = candles[-1]
+    return last.get("time"), last.get("complete"), tuple(sorted((last.get("mid") or {}).items()))
+
+def _current_candles(symbol, granularity, fetch_count, api_key=None, account_id=None, oanda_client=None):
+    """(candles, version) for a cacheable granularity, or (None, None) without data.
+    The complete history is cached by its last candle's time; the newest few candles, including
+    the forming one, are refetched once CANDLE_TAIL_TTL_S has passed and appended to it."""
+    key = (symbol, granularity, fetch_count)
+    with _CANDLE_FETCH_LOCKS.setdefault((symbol, granularity), threading.Lock()):
+        current = _CANDLE_CURRENT.get(key)
+        if current is not None and time.monotonic() - current[0] < CANDLE_TAIL_TTL_S:
+            return current[1], current[2]
+        tail = _fetch_candles(symbol, granularity, _CANDLE_TAIL_COUNT, api_key, account_id, oanda_client)
+        if not tail:
+            return None, None
+        closed = [c for c in tail if c.get("complete", True)]
+        history = _get_cached_candles(symbol, granularity, fetch_count, closed[-1]["time"]) if closed else None
+        if not history and closed:
+            history = _extend_history(symbol, granularity, fetch_count, closed)
+        if history:
+            candles = history + [c for c in tail if c["time"] > history[-1]["time"]]
+        else:
+            # One extra so the forming candle does not cost the history a bar
+            candles = _fetch_candles(symbol, granularity, fetch_count + 1, api_key, account_id, oanda_client)
+            if not candles:
+                return None, None
+            history = [c for c in candles if c.get("complete", True)][-fetch_count:]
+            if history:
+                _store_cached_candles(symbol, granularity, fetch_count, history[-1]["time"], history)
+        version = _candles_version(candles)
+        _CANDLE_CURRENT[key] = (time.monotonic(), candles, version)
+        return candles, version
+
+def _extend_history(symbol, granularity, fetch_count, closed) -> Optional[list]:
+    """Roll the cached history forward by the newly completed candles in `closed` when the
+    tail still overlaps it (one candle closed since), sparing a full history refetch"""
+    cached = _CANDLE_CACHE.get((symbol, granularity, fetch_count))
+    previous = cached[1] if cached is not None else None
+    if not previous:
+        return None
+    last_time = previous[-1]["time"]
+    if not any(c["time"] == last_time for c in closed):
+        return None  # gap since the cached history; refetch it whole
+    history = (previous + [c for c in closed if c["time"] > last_time])[-fetch_count:]
+    _store_cached_candles(symbol, granularity, fetch_count, history[-1]["time"], history)
+    return history
+
+def candle_version(symbol, granularity="H4", oanda_client=None):
+    """Version token of the candles get_oanda_data/get_oanda_hlc currently serve for a cacheable
+    granularity (see _candles_version), for memoising values derived from them; None if uncached."""
+    if not _candle_cacheable(granularity):
+        return None
+    try:
+        return _current_candles(_oanda_symbol(symbol), granularity, _CANDLE_FETCH_COUNT[granularity],
+                                oanda_client=oanda_client)[1]
+    except Exception as e:
+        print(f"[VALIDATORS] ❌ Error fetching OANDA data for {symbol}: {e}")
+        return None
+
+def _fetch_candles(symbol, granularity, count, api_key, account_id, oanda_client):
+    """One InstrumentsCandles request for get_oanda_data; None if credentials are missing"""
+    # If oanda_client is provided, use it directly
+    if oanda_client is not None:
+        client = oanda_client
+    else:
+        # Fall back to legacy behavior: use provided params or env vars
+        account_id = account_id or os.getenv("OANDA_ACCOUNT_ID")
+        token = api_key or os.getenv("OANDA_API_KEY")
         
+        if not token:
+            print("[VALIDATORS] ❌ Missing OANDA API credentials. Must be provided as parameters or set in environment (legacy mode).")
+            return None
+            
+        client = get_shared_client(token, "live")
+    
+    params = {
+        "count": count,
+        "granularity": granularity
+    }
+    
+    r = instruments.InstrumentsCandles(instrument=symbol, params=params)
+    client.request(r)
+    return r.response["candles"]
+
+def get_oanda_hlc(symbol, granularity="H4", count=50, oanda_client=None):
+    """get_oanda_data as (highs, lows, closes) columns (see _candles_to_hlc); None if no data.
+    Cacheable granularities parse the shared fetch (see _CANDLE_FETCH_COUNT) once per candle
+    version and hand out the last `count` rows (array views when numpy is available), so treat
+    the columns as read-only."""
+    if not _candle_cacheable(granularity):
+        candles = get_oanda_data(symbol, granularity, count, oanda_client=oanda_client)
+        return _candles_to_hlc(candles) if candles else None
+    symbol = _oanda_symbol(symbol)
+    fetch_count = max(count, _CANDLE_FETCH_COUNT[granularity])
+    try:
+        candles, version = _current_candles(symbol, granularity, fetch_count, oanda_client=oanda_client)
     except Exception as e:
         print(f"[VALIDATORS] ❌ Error fetching OANDA data for {symbol}: {e}")
         return None
+    if not candles:
+        return None
+    key = (symbol, granularity, fetch_count)
+    cached = _HLC_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        cached = _HLC_CACHE[key] = (version, _candles_to_hlc(candles))
+    hlc = cached[1]
+    if count < len(hlc[2]):
+        return hlc[0][-count:], hlc[1][-count:], hlc[2][-count:]
+    return hlc
 
 def calculate_rsi_from_data(prices, period=14):
     """Calculate RSI from price data"""
@@ -419,6 +608,8 @@ def calculate_ema(prices, period):
     """Calculate Exponential Moving Average"""
     if len(prices) < period:
         return None
+    if np is not None:
+        return ema_last(prices, period)  # compiled recurrence, or its NumPy closed form
     
     multiplier = 2 / (period + 1)
     ema = prices[0]  # Start with first price
@@ -447,8 +638,29 @@ def get_support_resistance_levels(symbol, lookback_periods=100, oanda_client=Non
     
     return support, resistance
 
+def _candles_to_hlc(candles):
+    """Parse OANDA mid candles into (highs, lows, closes) in a single walk.
+    Returns float64 arrays when numpy is available, else lists of floats."""
+    n = len(candles)
+    if np is None:
+        highs, lows, closes = [], [], []
+        for candle in candles:
+            mid = candle["mid"]
+            highs.append(float(mid["h"]))
+            lows.append(float(mid["l"]))
+            closes.append(float(mid["c"]))
+        return highs, lows, closes
+    highs, lows, closes = np.empty(n), np.empty(n), np.empty(n)
+    for i, candle in enumerate(candles):
+        mid = candle["mid"]
+        highs[i] = float(mid["h"])
+        lows[i] = float(mid["l"])
+        closes[i] = float(mid["c"])
+    return highs, lows, closes
+
+
 def _calculate_true_ranges_from_hlc(highs: List[float], lows: List[float], closes: List[float]) -> List[float]:
-    if not highs or not lows or not closes or len(highs) != len(lows) or len(highs) != len(closes):
+    if len(highs) == 0 or len(lows) == 0 or len(closes) == 0 or len(highs) != len(lows) or len(highs) != len(closes):
         return []
     true_ranges: List[float] = []
     for i in range(1, len(highs)):
@@ -459,7 +671,18 @@ def _calculate_true_ranges_from_hlc(highs: List[float], lows: List[float], close
     return true_ranges
 
 
+def _true_range_array(highs, lows, closes):
+    """True ranges of NumPy H/L/C columns in one vectorised pass (bars 1..n-1)"""
+    prev_close = closes[:-1]
+    return np.maximum(
+        highs[1:] - lows[1:],
+        np.maximum(np.abs(highs[1:] - prev_close), np.abs(lows[1:] - prev_close)),
+    )
+
+
 def _wilder_smooth(values: List[float], period: int) -> List[float]:
+    if HAVE_NUMBA:
+        return wilder_smooth(values, period)
     if len(values) < period or period <= 0:
         return []
     smoothed: List[float] = []
@@ -472,6 +695,38 @@ def _wilder_smooth(values: List[float], period: int) -> List[float]:
     return smoothed
 
 
+def _wilder_atr_last(highs, lows, closes, period: int) -> Optional[float]:
+    """Last Wilder-smoothed ATR over H/L/C lists or arrays; None if too few bars.
+    Uses the fused numba kernel when available, else a vectorised true-range pass for arrays."""
+    if HAVE_NUMBA:
+        return atr_wilder_last(highs, lows, closes, period)
+    if np is not None and isinstance(closes, np.ndarray):
+        tr_list = _true_range_array(highs, lows, closes).tolist()
+    else:
+        tr_list = _calculate_true_ranges_from_hlc(highs, lows, closes)
+    smoothed = _wilder_smooth(tr_list, period)
+    return smoothed[-1] if smoothed else None
+
+
+def get_m15_atr(symbol, oanda_client=None) -> Optional[float]:
+    """Wilder ATR(14) over the last 30 M15 candles (execution-timeframe SL buffer).
+    Memoised per 15-minute bucket unless CANDLE_CACHE=false; None if data is short."""
+    symbol = _oanda_symbol(symbol)
+    bucket = int(time.time() // M15_ATR_BUCKET_SECONDS) if CANDLE_CACHE_ENABLED else None
+    cached = _M15_ATR_CACHE.get((symbol, bucket))
+    if cached is not None:
+        return cached
+    hlc = get_oanda_hlc(symbol, "M15", 30, oanda_client=oanda_client)
+    if hlc is None or len(hlc[2]) < 21:
+        return None
+    atr = _wilder_atr_last(*hlc, 14)
+    if bucket is not None and atr:
+        for stale in [k for k in list(_M15_ATR_CACHE) if k[1] != bucket]:
+            _M15_ATR_CACHE.pop(stale, None)
+        _M15_ATR_CACHE[(symbol, bucket)] = atr
+    return atr
+
+
 def calculate_adx_from_hlc(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> Optional[float]:
     try:
         if len(highs) < period + 2 or len(lows) < period + 2 or len(closes) < period + 2:
@@ -524,23 +779,29 @@ def get_h4_trend_adx_atr_percent(symbol: str, adx_period: int = 14, atr_period:
     - trend: 'bullish' or 'bearish' from EMA50 vs EMA200
     - adx: Wilder's ADX value
     - atr_percent: ATR(atr_period)/close*100
+    Memoised per H4 candle version (like calculate_atr) unless CANDLE_CACHE=false.
     """
-    candles = get_oanda_data(symbol, "H4", max(atr_period, 200) + 5, oanda_client=oanda_client)
-    if not candles or len(candles) < max(atr_period, 200) + 1:
+    symbol = _oanda_symbol(symbol)
+    key = (symbol, adx_period, atr_period)
+    version = candle_version(symbol, "H4", oanda_client=oanda_client)
+    cached = _H4_REGIME_CACHE.get(key)
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    hlc = get_oanda_hlc(symbol, "H4", max(atr_period, 200) + 5, oanda_client=oanda_client)
+    if hlc is None or len(hlc[2]) < max(atr_period, 200) + 1:
         return None, None, None
-    closes = [float(c["mid"]["c"]) for c in candles]
-    highs = [float(c["mid"]["h"]) for c in candles]
-    lows = [float(c["mid"]["l"]) for c in candles]
+    # Shared parsed columns; the ADX loop indexes element-wise, so give it plain lists
+    highs, lows, closes = (col.tolist() for col in hlc) if np is not None else hlc
     ema50 = calculate_ema(closes[-50:], 50)
     ema200 = calculate_ema(closes, 200)
     trend = None
     if ema50 and ema200:
         trend = "bullish" if ema50 > ema200 else "bearish"
     adx = calculate_adx_from_hlc(highs, lows, closes, adx_period)
-    tr_list = _calculate_true_ranges_from_hlc(highs, lows, closes)
-    atr_values = _wilder_smooth(tr_list, atr_period)
-    atr = atr_values[-1] if atr_values else None
+    atr = _wilder_atr_last(highs, lows, closes, atr_period)
     atr_percent = (atr / closes[-1] * 100.0) if (atr and closes[-1] > 0) else None
+    if version is not None:
+        _H4_REGIME_CACHE[key] = (version, (trend, adx, atr_percent))
     return trend, adx, atr_percent
 
 
@@ -646,9 +907,7 @@ def validate_m10_entry(symbol: str, side: str, relax: bool = False, oanda_client
     mom20 = ((closes[-1] - closes[-20]) / closes[-20]) * 100 if len(closes) >= 21 else 0.0
     # EMA20 and ATR for pullback zone
     ema20 = calculate_ema(closes[-20:], 20)
-    tr_list = _calculate_true_ranges_from_hlc(highs, lows, closes)
-    atr10_series = _wilder_smooth(tr_list, 10)
-    atr10 = atr10_series[-1] if atr10_series else None
+    atr10 = _wilder_atr_last(highs, lows, closes, 10)
     if any(v is None for v in [rsi, ema20, atr10]):
         print("[VALIDATORS] ❌ Missing M10 indicators (RSI/EMA20/ATR10)")
         return False